@@ -1,16 +1,53 @@
 import os
-from typing import Any, List
+import threading
+from contextlib import contextmanager
+from typing import List, Tuple, Union
 
-import numpy as np
 import pandas as pd
+from django.db import connections, transaction
+from django.utils.dateparse import parse_datetime
+from pandas.core.frame import DataFrame
 from pandas.core.series import Series
 
 from . import fields
-from .services import BACKUP_DIR, DatabaseExportService
+from .conf import get_setting
+from .journal import COMPLETED, RUNNING, SYNC, CheckpointJournal
+from .keyindex import KeyIndex, build_key_index
+from .keymap import KeyMap
+from .loaders import get_loader_class
+from .metrics import MapperMetrics
+from .pipeline import Pipeline
+from .plans import (
+    FieldRule,
+    check_fanout,
+    check_mapper,
+    compile_dtype_plan,
+    compile_field_plan,
+)
+from .rejects import RejectedRows, RejectReport
+from .services import DatabaseExportService, get_snapshot_path
+from .snapshots import get_snapshot_class
 
-# Instead of storing data here, prefer another storage option for large data.
+# Key indexes (primary keys of imported destination models) by key name of
+# the mapper (see `BaseModelMap.get_key_name`).
 DATASET = {}
 
+# Source tables which are already imported in the current run.
+IMPORTED_TABLES = set()
+
+# Locks by key name, they keep threads of a parallel import from importing
+# the related table or building its key index at the same time.
+KEY_INDEX_LOCKS = {}
+
+
+def clear_key_indexes(mapper_class) -> None:
+    """
+    Removes key indexes of the mapper (or of the mappers of a fan-out), so
+    that they are rebuilt when they are needed next time.
+    """
+    for mapper in mapper_class.get_mappers():
+        DATASET.pop(mapper.get_key_name(), None)
+
 
 class DatabaseExportModel:
     sourcetable = None
@@ -27,8 +64,44 @@ class DatabaseExportModel:
             )
         return self.sourcetable
 
+    def get_export_filters(self) -> list:
+        """
+        Returns additional conditions of the export query as a list of
+        `(sql, params)` tuples.
+        """
+        return []
+
+    def get_export_ordering(self):
+        """
+        Returns column which exported rows are ordered by.
+        """
+        return None
+
+    def get_export_columns(self):
+        """
+        Returns columns which are exported, or `None` to export all of
+        them.
+        """
+        return None
+
+    def get_export_service(self, **kwargs) -> DatabaseExportService:
+        return DatabaseExportService(
+            tablename=self.get_table_name(),
+            partition=getattr(self, "partition", None),
+            filters=self.get_export_filters(),
+            order_by=self.get_export_ordering(),
+            metrics=getattr(self, "metrics", None),
+            select_columns=self.get_export_columns(),
+            source_pk=getattr(self, "source_pk", None),
+            **kwargs,
+        )
+
     def export_to_csv(self) -> None:
-        database_export_service = DatabaseExportService(tablename=self.get_table_name())
+        """
+        Exports source table to a snapshot file (format depends on the
+        `SNAPSHOT_FORMAT` setting).
+        """
+        database_export_service = self.get_export_service()
         database_export_service.export()
 
 
@@ -41,12 +114,69 @@ class BaseModelMap(DatabaseExportModel):
     sourcetable = None
     exclude_fields = []
     renamed_columns = {}
+    # Number of source rows read, mapped and inserted at a time. Falls back
+    # to `IMPORT_CHUNK_SIZE` setting when not set.
+    chunk_size = None
+    # Name of the loader used to insert rows (`bulk_create` or `copy`).
+    # Falls back to `LOADER` setting when not set.
+    loader = None
+    # `snapshot` exports the source table to a snapshot file and reads it
+    # back, `direct` streams rows from the source database to the mapping
+    # stage.
+    # Falls back to `SOURCE_MODE` setting when not set.
+    source_mode = None
+    # Number of partitions of the source table which are imported
+    # concurrently by `import_data_parallel`. Partitions are ranges of
+    # `source_pk` with the same number of rows (`range`) or remainders of
+    # integer `source_pk` (`hash`).
+    partitions = None
+    partition_by = "range"
+    source_pk = "id"
+    # Source column which grows whenever a row is added or changed (e.g.
+    # `updated_at` or an increasing `id`). `syncdata` only imports rows
+    # past the value stored by the previous sync.
+    watermark_column = None
+    # Source primary keys are written to the destination table as they are,
+    # so reference fields are resolved by key alone. Sequences of the
+    # destination table are reset once the import is done. Otherwise the
+    # destination database assigns primary keys and they are recorded in
+    # the key map of the table (see `KeyMap`).
+    preserve_pk = True
+    # Condition which source rows need to match to be imported, either SQL
+    # or `(sql, params)` tuple, e.g. `("created_at >= %s", ["2020-01-01"])`.
+    source_filter = None
+    # Column (or list of columns) which source rows are exported in, prefix
+    # a column with `-` for descending order. Ignored with checkpoints and
+    # incremental sync, which order rows by their watermark.
+    source_ordering = None
+    # Pandas types of source columns read from CSV snapshots, e.g.
+    # `{"age": "Int64"}`, they override types derived from the destination
+    # fields. `None` lets pandas infer the type of the column.
+    source_dtypes = {}
+    # Fan-out mapper which imports this mapper along with other mappers of
+    # the same source table, it is set by `FanOutMap`.
+    fanout = None
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # Mappers without destination model or source table are treated as
+        # base classes of other mappers.
+        if cls.destmodel is not None and cls.sourcetable is not None:
+            check_mapper(cls)
 
     def __init__(self) -> None:
         self._check_required_attributes()
+        self.partition = None
+        self.checkpoint = None
+        self.checkpoint_journal = None
+        self.incremental = False
+        self.sync_checkpoint = None
+        self.key_map = None
+        self.imported_rows = 0
+        self.rejects = RejectReport(self.sourcetable)
+        self.metrics = MapperMetrics(self.sourcetable)
 
     def _check_required_attributes(self) -> None:
-        print(self.destmodel)
         assert self.destmodel is not None, (
             "'%s' should include a `destmodel` attribute" % self.__class__.__name__
         )
@@ -91,103 +221,760 @@ class BaseModelMap(DatabaseExportModel):
         fields.update(self.get_deferred_fields())
         return fields
 
-    def get_reference_field_val(
+    def get_reference_field_values(
         self,
         field: fields.ReferenceField,
-        row: Series,
-    ) -> Any:
-        """
-        Extract value for the reference field from related table.
-        We searched in `DATASET` for the data, if not found we make
-        sure to prepopulate data in retated table and the retrieve the
-        foreign key data for current table.
-        """
-        if field.mapper.sourcetable not in DATASET:
-            field.mapper().importdata()
-            objects = field.mapper.destmodel.objects.all()
-            dictionary = {}
-            for obj in objects:
-                dictionary[obj.pk] = obj
-            DATASET[field.mapper.sourcetable] = dictionary
-        key = row.get(field.source)
-
-        if key:
-            fk = DATASET[field.mapper.sourcetable].get(key)
-            if not fk:
-                """@TODO: Handle this condition."""
-                print(key)
-            return fk
-        return None
+        df: DataFrame,
+    ) -> Tuple[Series, Series]:
+        """
+        Resolves the reference field for every row of the given DataFrame
+        with one vectorized lookup in the key index of the related table.
+
+        Returns primary keys of the related rows and reasons of the rows
+        which could not be resolved (`null` if the source column is empty,
+        `missing` if the key is not present in the related table, `None`
+        for resolved rows).
+        """
+        key_index = self.get_key_index(field.mapper)
+        values = Series(None, index=df.index, dtype=object)
+        reasons = Series("null", index=df.index, dtype=object)
+        if field.source not in df.columns:
+            return values, reasons
+
+        column = df[field.source]
+        present = column.notna()
+        keys = column[present]
+        if key_index.numeric:
+            keys = pd.to_numeric(keys.astype(object), errors="coerce")
+
+        found, stored = key_index.lookup(keys.to_numpy())
+        resolved = keys.index[found]
+        values[resolved] = Series(stored[found], index=resolved, dtype=object)
+        reasons[present] = "missing"
+        reasons[resolved] = None
+        return values, reasons
+
+    def get_key_index(self, mapper_class) -> Union[KeyIndex, KeyMap]:
+        """
+        Returns key index of the related mapper, related table is imported
+        first if it is not imported yet. Key map of the related table is
+        returned if the related mapper does not preserve primary keys.
+        """
+        name = mapper_class.get_key_name()
+        with KEY_INDEX_LOCKS.setdefault(name, threading.RLock()):
+            if mapper_class.sourcetable not in IMPORTED_TABLES:
+                importer = mapper_class.get_importer()
+                if self.incremental:
+                    importer().syncdata()
+                else:
+                    importer().importdata()
+            if name not in DATASET:
+                if mapper_class.preserve_pk:
+                    DATASET[name] = build_key_index(mapper_class.destmodel)
+                else:
+                    DATASET[name] = KeyMap(name)
+            return DATASET[name]
+
+    def get_key_map(self) -> KeyMap:
+        """
+        Returns key map which records primary keys assigned to the imported
+        rows by the destination database.
+        """
+        if self.key_map is None:
+            self.key_map = KeyMap(self.get_key_name())
+        return self.key_map
+
+    def reset_key_maps(self) -> None:
+        """
+        Removes keys recorded by the previous import if primary keys are
+        not preserved.
+        """
+        if not self.preserve_pk:
+            self.get_key_map().reset()
+
+    @classmethod
+    def get_key_name(cls) -> str:
+        """
+        Returns name which the key index and key map of the mapper are
+        stored under. Mappers of a fan-out share the source table, so the
+        destination table is added to their name.
+        """
+        if cls.fanout is None:
+            return cls.sourcetable
+        return f"{cls.sourcetable}.{cls.destmodel._meta.db_table}"
+
+    @classmethod
+    def get_mappers(cls) -> list:
+        """
+        Returns mappers which write to destination models when this one is
+        imported.
+        """
+        return [cls]
+
+    @classmethod
+    def get_importer(cls):
+        """
+        Returns mapper which imports this one. Mappers of a fan-out are
+        only imported along with the other mappers of the fan-out, their
+        source table is then marked as imported for all of them.
+        """
+        return cls.fanout or cls
+
+    @classmethod
+    def get_referenced_mappers(cls) -> list:
+        """
+        Returns mappers referenced by `ReferenceField`s of the mapper.
+        """
+        return [
+            attrval.mapper
+            for attrval in vars(cls).values()
+            if isinstance(attrval, fields.ReferenceField)
+        ]
+
+    @classmethod
+    def get_dependencies(cls) -> list:
+        """
+        Returns mappers of the related tables which need to be imported
+        before this one.
+        """
+        return list(
+            dict.fromkeys(
+                mapper.get_importer() for mapper in cls.get_referenced_mappers()
+            )
+        )
+
+    def get_method_field_values(self, name: str, df: DataFrame) -> Series:
+        """
+        Returns values of the method field for every row of the given
+        DataFrame. Mapper can define `get_<fieldname>_values(df)` to derive
+        the whole column at once, otherwise `get_<fieldname>_value(row)`
+        is called for each row. Values of the rows are python objects,
+        missing values of nullable columns are `None` instead of `pd.NA`.
+        """
+        batch_method = getattr(self, f"get_{name}_values", None)
+        if batch_method is not None:
+            return Series(batch_method(df), index=df.index, dtype=object)
+
+        method = getattr(self, f"get_{name}_value")
+        rows = df.astype(object).where(df.notna(), None)
+        return Series(
+            [method(row) for _, row in rows.iterrows()],
+            index=df.index,
+            dtype=object,
+        )
 
-    def add_to_dest_db(self, dataset: List[dict]) -> None:
-        dest_objects = []
-        for data in dataset:
-            dest_objects.append(self.destmodel(**data))
-        self.destmodel.objects.bulk_create(
-            dest_objects,
-            batch_size=1000,
+    def get_field_plan(self) -> tuple:
+        """
+        Returns rules which describe how each destination field is derived
+        from the source data. Plan is compiled once per mapper class and
+        shared by its instances.
+        """
+        # Looked up in the class itself, subclasses compile their own plan.
+        plan = self.__class__.__dict__.get("_field_plan")
+        if plan is None:
+            plan = compile_field_plan(self)
+            self.__class__._field_plan = plan
+        return plan
+
+    def get_source_dtypes(self) -> dict:
+        """
+        Returns pandas types of the source columns which are read from CSV
+        snapshots (see `CSV_DTYPES` setting).
+        """
+        dtypes = {}
+        if get_setting("CSV_DTYPES"):
+            dtypes.update(compile_dtype_plan(self))
+        dtypes.update(self.source_dtypes)
+        return {column: dtype for column, dtype in dtypes.items() if dtype is not None}
+
+    def map_dataframe(self, df: DataFrame, rejected: RejectedRows = None) -> List[dict]:
+        """
+        Maps source rows to the dictionaries of destination field values.
+        Each rule of the field plan is applied to the whole column instead
+        of row by row. Rows with unresolved reference fields are skipped,
+        they are added to `rejected` (or written to the reject report right
+        away if it is not given).
+        """
+        plan = self.get_field_plan()
+        chunk_rejects = RejectedRows() if rejected is None else rejected
+        keep = Series(True, index=df.index)
+        reasons_by_row = Series(None, index=df.index, dtype=object)
+
+        references = {}
+        with self.metrics.measure("resolve") as stage:
+            for rule in plan:
+                if rule.kind != FieldRule.REFERENCE:
+                    continue
+                values, reasons = self.get_reference_field_values(rule.field, df)
+                references[rule.name] = values
+                failed = reasons.notna()
+                chunk_rejects.add(rule.name, reasons[failed])
+                # Rejected rows are reported with the first failing field.
+                reasons_by_row = reasons_by_row.where(
+                    reasons_by_row.notna() | ~failed,
+                    rule.name + ":" + reasons.astype(str),
+                )
+                keep &= ~failed
+            stage.rows += len(df)
+
+        with self.metrics.measure("map") as stage:
+            columns = []
+            for rule in plan:
+                if rule.kind == FieldRule.METHOD:
+                    values = self.get_method_field_values(rule.name, df)
+                elif rule.kind == FieldRule.CONVERT:
+                    values = Series(
+                        rule.field.converter(df), index=df.index, dtype=object
+                    )
+                elif rule.kind == FieldRule.REFERENCE:
+                    values = references[rule.name]
+                elif rule.kind != FieldRule.EXCLUDE and rule.source in df.columns:
+                    values = df[rule.source]
+                else:
+                    values = Series(None, index=df.index, dtype=object)
+
+                # Missing values (NaN) are stored as `None` in the database.
+                columns.append(values.astype(object).where(values.notna(), None))
+
+            chunk_rejects.add_rows(
+                df[~keep], reasons_by_row[~keep], self.get_mapper_name()
+            )
+
+            names = [rule.attname for rule in plan]
+            rows = zip(*(values[keep].tolist() for values in columns))
+            dataset = [dict(zip(names, row)) for row in rows]
+            stage.rows += len(df)
+        if rejected is None:
+            self.rejects.write(chunk_rejects)
+        return dataset
+
+    def get_loader(self, loader=None):
+        """
+        Returns loader which writes mapped rows to the destination model.
+        """
+        loader_class = get_loader_class(loader or self.loader or get_setting("LOADER"))
+        return loader_class(
+            self.destmodel,
+            upsert=self.incremental,
+            return_keys=not self.preserve_pk,
         )
 
+    def add_to_dest_db(self, dataset: List[dict], loader=None) -> None:
+        """
+        Inserts mapped rows in the destination table. If primary keys are
+        not preserved, source keys are taken out of the rows and recorded
+        in the key map along with the keys assigned by the database.
+        """
+        loader = self.get_loader(loader)
+        source_keys = None
+        if not self.preserve_pk:
+            attname = self.destmodel._meta.pk.attname
+            source_keys = [data.pop(attname, None) for data in dataset]
+
+        with self.metrics.measure("load") as stage:
+            dest_keys = loader.load(dataset)
+            stage.rows += len(dataset)
+            stage.bytes_written += loader.bytes_written
+
+        if source_keys is not None:
+            self.get_key_map().add(source_keys, dest_keys)
+
+    def get_source_columns(self) -> list:
+        """
+        Returns columns of the source table. Table name is used as it is in
+        the export query, so it may include a schema.
+        """
+        with connections["source"].cursor() as cursor:
+            cursor.execute(
+                "SELECT * FROM {0} WHERE 1 = 0".format(self.get_table_name())
+            )
+            return [column[0] for column in cursor.description]
+
+    def get_export_columns(self):
+        """
+        Returns source columns which are used by the field plan, so that
+        columns of excluded fields and columns which are not mapped to any
+        field are not exported. All columns are exported if one of the
+        method fields does not tell which columns it reads.
+        """
+        needed = {self.source_pk}
+        if self.watermark_column:
+            needed.add(self.watermark_column)
+        for rule in self.get_field_plan():
+            if rule.kind == FieldRule.EXCLUDE:
+                continue
+            if rule.kind in (FieldRule.METHOD, FieldRule.CONVERT):
+                sources = rule.field.get_sources()
+                if sources is None:
+                    return None
+                needed.update(sources)
+            elif rule.source:
+                needed.add(rule.source)
+
+        source_columns = self.get_source_columns()
+        if not source_columns:
+            return None
+        return [column for column in source_columns if column in needed]
+
+    def get_export_filters(self) -> list:
+        filters = super().get_export_filters()
+        if self.source_filter:
+            if isinstance(self.source_filter, str):
+                filters.append((self.source_filter, []))
+            else:
+                sql, params = self.source_filter
+                filters.append((sql, list(params)))
+        if self.incremental and self.sync_checkpoint["watermark"] is not None:
+            # Rows with the same value as the watermark are fetched again,
+            # they might have been added after the previous sync. Upsert
+            # makes it harmless.
+            column = connections["source"].ops.quote_name(self.watermark_column)
+            watermark = self.sync_checkpoint["watermark"]
+            if isinstance(watermark, str):
+                # Datetimes are stored as ISO 8601 strings.
+                watermark = parse_datetime(watermark) or watermark
+            filters.append((f"{column} >= %s", [watermark]))
+        if self.checkpoint and self.checkpoint["watermark"] is not None:
+            # Resume after the last committed row.
+            column = connections["source"].ops.quote_name(self.source_pk)
+            filters.append((f"{column} > %s", [self.checkpoint["watermark"]]))
+        return filters
+
+    def get_export_ordering(self):
+        if self.incremental:
+            return self.watermark_column
+        if self.checkpoint is not None:
+            # Watermark is only meaningful if rows are ordered by it.
+            return self.source_pk
+        if self.source_ordering:
+            return self.source_ordering
+        return super().get_export_ordering()
+
+    @classmethod
+    def get_mapper_name(cls) -> str:
+        """
+        Returns dotted path of the mapper class.
+        """
+        return f"{cls.__module__}.{cls.__qualname__}"
+
+    def get_checkpoint_key(self) -> Tuple[str, str]:
+        """
+        Returns key of the mapper (and its partition) in the checkpoint
+        journal.
+        """
+        return self.get_mapper_name(), self.partition.name if self.partition else ""
+
+    def get_watermark(self, df: DataFrame, column: str = None):
+        """
+        Returns value of the last row of the chunk in the watermark column
+        (`source_pk` by default).
+        """
+        column = column or self.source_pk
+        if column not in df.columns:
+            raise ValueError(
+                "Source table should include watermark column '{0}' "
+                "(source: {1})".format(column, self.__class__.__name__)
+            )
+        if df.empty:
+            return None
+        watermark = df[column].iloc[-1]
+        return watermark.item() if hasattr(watermark, "item") else watermark
+
+    def get_row_count(self, dataset: List[dict]) -> int:
+        """
+        Returns number of destination rows of a mapped chunk.
+        """
+        return len(dataset)
+
+    def save_chunk(
+        self,
+        df: DataFrame,
+        dataset: List[dict],
+        rejected: RejectedRows,
+        loader=None,
+    ) -> None:
+        """
+        Inserts mapped rows of a chunk. With checkpoints enabled, the chunk
+        and its checkpoint are committed in the same transaction. Rejected
+        rows of the chunk are written to the reject report once it is
+        committed.
+        """
+        if self.checkpoint is None:
+            self.add_to_dest_db(dataset, loader=loader)
+        else:
+            with transaction.atomic():
+                self.add_to_dest_db(dataset, loader=loader)
+                self.checkpoint["chunks"] += 1
+                self.checkpoint["rows"] += self.get_row_count(dataset)
+                if not df.empty:
+                    self.checkpoint["watermark"] = self.get_watermark(df)
+                self.checkpoint_journal.save(
+                    *self.get_checkpoint_key(), self.checkpoint
+                )
+        self.rejects.write(rejected)
+
     def get_source_file_path(self, datadir: str) -> str:
         """
         Returns source file path
         """
-        source_file_path = self.sourcetable + ".csv"
-        if datadir != "":
-            source_file_path = os.path.join(datadir, source_file_path)
+        return get_snapshot_path(
+            self.sourcetable, partition=self.partition, datadir=datadir
+        )
+
+    def get_chunk_size(self, chunk_size=None) -> int:
+        """
+        Returns number of rows which are processed at a time.
+        """
+        return chunk_size or self.chunk_size or get_setting("IMPORT_CHUNK_SIZE")
+
+    def get_source_mode(self, source_mode=None) -> str:
+        """
+        Returns the way source rows are read (`snapshot` or `direct`).
+        """
+        source_mode = source_mode or self.source_mode or get_setting("SOURCE_MODE")
+        if source_mode not in ("snapshot", "direct"):
+            raise ValueError(
+                "Unknown source mode '{0}' (source: {1})".format(
+                    source_mode, self.__class__.__name__
+                )
+            )
+        return source_mode
+
+    def iter_source_chunks(self, datadir="", chunk_size=None, source_mode=None):
+        """
+        Yields DataFrames of source rows with at most `chunk_size` rows.
+
+        In `direct` mode rows are fetched from the source database and
+        keep the python types returned by the database driver. Snapshot
+        file is written along the way only if `KEEP_SNAPSHOT` setting is set.
+        """
+        chunk_size = self.get_chunk_size(chunk_size)
+
+        if self.get_source_mode(source_mode) == "direct":
+            service = self.get_export_service(chunk_size=chunk_size)
+            chunks = service.iter_chunks(save_snapshot=get_setting("KEEP_SNAPSHOT"))
+            try:
+                for rows in chunks:
+                    with self.metrics.measure("parse") as stage:
+                        df = DataFrame(rows, columns=service.columns, dtype=object)
+                        stage.rows += len(df)
+                    yield df
+            finally:
+                # Closes the source connection if the reader stops early.
+                chunks.close()
+            return
+
+        source_file_path = self.get_source_file_path(datadir)
+
+        self.export_to_csv()
+        snapshot = get_snapshot_class(get_setting("SNAPSHOT_FORMAT"))(source_file_path)
+        self.metrics.get_stage("parse").bytes_read += os.path.getsize(source_file_path)
+        chunks = snapshot.read_chunks(
+            chunk_size,
+            columns=self.get_export_columns(),
+            dtypes=self.get_source_dtypes(),
+            engine=get_setting("CSV_ENGINE"),
+        )
+        yield from self.metrics.measure_iter("parse", chunks)
+
+    def iter_mapped_chunks(self, chunks):
+        """
+        Yields source chunks along with their mapped and rejected rows.
+        """
+        for df in chunks:
+            rejected = RejectedRows()
+            yield df, self.map_dataframe(df, rejected), rejected
+
+    @contextmanager
+    def pipeline(self, chunks):
+        """
+        Yields source chunks along with their mapped and rejected rows.
+
+        With `PIPELINE` setting, source chunks are read and mapped in two
+        background threads while the caller loads the previous chunk, so
+        that reading the source database, mapping and writing to the
+        destination database overlap. At most `PIPELINE_DEPTH` chunks wait
+        between two stages. Related tables are imported before the
+        pipeline is started.
+        """
+        if not get_setting("PIPELINE"):
+            yield self.iter_mapped_chunks(chunks)
+            return
+
+        for mapper_class in self.get_referenced_mappers():
+            self.get_key_index(mapper_class)
+
+        with Pipeline(get_setting("PIPELINE_DEPTH")) as pipeline:
+            source_chunks = pipeline.add(chunks)
+            yield pipeline.add(self.iter_mapped_chunks(source_chunks))
+
+    def import_chunks(self, datadir, chunk_size, loader, source_mode) -> None:
+        """
+        Reads, maps and inserts source rows chunk by chunk. If checkpoint of
+        a previous run exists, import continues after its watermark.
+        """
+        if self.checkpoint is not None and self.checkpoint["status"] == RUNNING:
+            print(
+                f"Resuming {self.sourcetable} after {self.checkpoint['rows']} rows "
+                f"(watermark: {self.checkpoint['watermark']})"
+            )
         else:
-            source_file_path = os.path.join(BACKUP_DIR, source_file_path)
-        return source_file_path
+            self.rejects.reset()
+            if self.partition is None:
+                self.reset_key_maps()
+            if self.checkpoint_journal is not None:
+                self.checkpoint = {
+                    "status": RUNNING,
+                    "chunks": 0,
+                    "rows": 0,
+                    "watermark": None,
+                }
+
+        chunks = self.iter_source_chunks(datadir, chunk_size, source_mode)
+        with self.pipeline(chunks) as mapped_chunks:
+            for df, dataset, rejected in mapped_chunks:
+                self.save_chunk(df, dataset, rejected, loader=loader)
+                self.imported_rows += self.get_row_count(dataset)
+
+        if self.checkpoint is not None:
+            self.checkpoint["status"] = COMPLETED
+            self.checkpoint_journal.save(*self.get_checkpoint_key(), self.checkpoint)
 
-    def importdata(self, datadir=""):
+    def importdata(
+        self,
+        datadir="",
+        chunk_size=None,
+        loader=None,
+        source_mode=None,
+        partition=None,
+    ):
         """
         This is main method of this class that needs to be called to
         start import process.
+
+        Source rows are processed in chunks. Each chunk is read, mapped and
+        inserted before the next one is read, so memory usage does not
+        depend on the size of the table. If `partition` is given, only
+        rows of that partition are imported.
         """
-        source_file_path = self.get_source_file_path(datadir)
+        self.partition = partition
+        self.imported_rows = 0
+        self.rejects = RejectReport(self.sourcetable, partition)
+        self.metrics = MapperMetrics(self.sourcetable, partition)
 
-        self.export_to_csv()
-        df = pd.read_csv(source_file_path)
+        self.checkpoint = None
+        self.checkpoint_journal = None
+        if get_setting("CHECKPOINTS"):
+            self.checkpoint_journal = CheckpointJournal()
+            self.checkpoint = self.checkpoint_journal.get(*self.get_checkpoint_key())
 
-        modelfields = self.get_fields()
+        if self.checkpoint and self.checkpoint["status"] == COMPLETED:
+            print(f"Skipping {self.sourcetable}, it is already imported")
+        else:
+            self.import_chunks(datadir, chunk_size, loader, source_mode)
 
-        dataset = []
-        skip = False
-        for i, row in df.iterrows():
-            data = {}
-            for field, fieldval in modelfields.items():
-                data[field] = None
-                if field in self.exclude_fields:
-                    continue
-                elif field in self.renamed_columns:
-                    key = self.renamed_columns[field]
-                    value = row.get(key)
-                    data[field] = value
-                elif isinstance(fieldval, fields.MethodField):
-                    method_name = f"get_{field}_value"
-                    method = getattr(self, method_name)
-                    data[field] = method(row)
-                elif isinstance(fieldval, fields.ReferenceField):
-                    data[field] = self.get_reference_field_val(
-                        fieldval,
-                        row,
+        if partition is None:
+            IMPORTED_TABLES.add(self.sourcetable)
+            # Key index is rebuilt when it is needed next time.
+            clear_key_indexes(self.__class__)
+
+        if self.rejects.total:
+            print(
+                f"Rejected {self.rejects.total} rows from {self.sourcetable} "
+                f"({self.rejects.get_file_path()})"
+            )
+        self.metrics.finish(
+            self.imported_rows, self.rejects.total, self.rejects.summary()
+        )
+
+    def syncdata(self, datadir="", chunk_size=None, loader=None, source_mode=None):
+        """
+        Imports only source rows which are added or changed since the
+        previous sync, rows which already exist in the destination table
+        are updated. The first sync imports the whole table.
+
+        Last value of `watermark_column` is kept in the checkpoint journal,
+        it is saved once all rows of the sync are loaded, so an interrupted
+        sync is repeated from the previous watermark.
+        """
+        if not self.watermark_column:
+            raise ValueError(
+                "Add `watermark_column` attribute to sync data (source: {0})".format(
+                    self.__class__.__name__
+                )
+            )
+        for mapper in self.get_mappers():
+            if not mapper.preserve_pk:
+                raise ValueError(
+                    "Rows can only be synced if `preserve_pk` is set, changed "
+                    "rows are matched by primary key (source: {0})".format(
+                        mapper.__name__
                     )
-                    if not data[field]:
-                        skip = True
-                else:
-                    value = row.get(fieldval.source)
-
-                    if not value:
-                        try:
-                            value = df[i][fieldval.source]
-                        except:
-                            """
-                            @TODO: Handle this condition
-                            """
-                    data[field] = value
-
-                if isinstance(data[field], float) and np.isnan(data[field]):
-                    data[field] = None
-            if not skip:
-                dataset.append(data)
-        self.add_to_dest_db(dataset)
+                )
+
+        self.partition = None
+        self.incremental = True
+        self.imported_rows = 0
+        self.rejects = RejectReport(self.sourcetable)
+        self.rejects.reset()
+        self.metrics = MapperMetrics(self.sourcetable)
+
+        journal = CheckpointJournal()
+        key = (self.get_checkpoint_key()[0], SYNC)
+        self.sync_checkpoint = journal.get(*key) or {
+            "status": COMPLETED,
+            "chunks": 0,
+            "rows": 0,
+            "watermark": None,
+        }
+        watermark = self.sync_checkpoint["watermark"]
+
+        chunks = self.iter_source_chunks(datadir, chunk_size, source_mode)
+        with self.pipeline(chunks) as mapped_chunks:
+            for df, dataset, rejected in mapped_chunks:
+                self.add_to_dest_db(dataset, loader=loader)
+                self.rejects.write(rejected)
+                self.imported_rows += self.get_row_count(dataset)
+                if not df.empty:
+                    watermark = self.get_watermark(df, self.watermark_column)
+
+        # `chunks` counts sync passes of the mapper.
+        self.sync_checkpoint["chunks"] += 1
+        self.sync_checkpoint["rows"] += self.imported_rows
+        self.sync_checkpoint["watermark"] = watermark
+        journal.save(*key, self.sync_checkpoint)
+
+        IMPORTED_TABLES.add(self.sourcetable)
+        clear_key_indexes(self.__class__)
+
+        print(f"Synced {self.imported_rows} rows from {self.sourcetable}")
+        if self.rejects.total:
+            print(
+                f"Rejected {self.rejects.total} rows from {self.sourcetable} "
+                f"({self.rejects.get_file_path()})"
+            )
+        self.metrics.finish(
+            self.imported_rows, self.rejects.total, self.rejects.summary()
+        )
+
+
+class FanOutMap(BaseModelMap):
+    """
+    Imports one source table into several destination models in a single
+    pass. Each destination model has its own mapper (with its own field
+    plan) in `mappers`, source rows are exported and parsed once and every
+    chunk is mapped and loaded by each of the mappers.
+
+    Mappers should have the same `sourcetable` as the fan-out. Export
+    options (`source_filter`, `partitions`, `watermark_column`, ...) of the
+    fan-out apply, the ones of the mappers are ignored. Rows of a chunk can
+    be routed to the mappers by overriding `get_mapper_rows`.
+    """
+
+    # Mappers of the destination models, in the order they are loaded.
+    mappers = []
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.mappers:
+            check_fanout(cls)
+            for mapper_class in cls.mappers:
+                mapper_class.fanout = cls
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.mapper_instances = [mapper_class() for mapper_class in self.mappers]
+
+    def _check_required_attributes(self) -> None:
+        assert self.mappers, (
+            "'%s' should include a `mappers` attribute" % self.__class__.__name__
+        )
+
+        assert self.sourcetable is not None, (
+            "'%s' should include a `sourcetable` attribute" % self.__class__.__name__
+        )
+
+    @classmethod
+    def get_mappers(cls) -> list:
+        return list(cls.mappers)
+
+    @classmethod
+    def get_referenced_mappers(cls) -> list:
+        referenced = []
+        for mapper_class in cls.mappers:
+            referenced.extend(mapper_class.get_referenced_mappers())
+        return list(dict.fromkeys(referenced))
+
+    def get_bound_mappers(self) -> list:
+        """
+        Returns instances of the mappers which share state of the current
+        import (partition, sync, rejected rows and metrics) with the fan-out.
+        """
+        for mapper in self.mapper_instances:
+            mapper.partition = self.partition
+            mapper.incremental = self.incremental
+            mapper.rejects = self.rejects
+            mapper.metrics = self.metrics
+        return self.mapper_instances
+
+    def reset_key_maps(self) -> None:
+        for mapper in self.get_bound_mappers():
+            mapper.reset_key_maps()
+
+    def get_export_columns(self):
+        """
+        Returns source columns which are used by any of the mappers.
+        """
+        needed = {self.source_pk}
+        if self.watermark_column:
+            needed.add(self.watermark_column)
+        for mapper in self.mapper_instances:
+            columns = mapper.get_export_columns()
+            if columns is None:
+                return None
+            needed.update(columns)
+        return [column for column in self.get_source_columns() if column in needed]
+
+    def get_source_dtypes(self) -> dict:
+        """
+        Returns pandas types of the source columns, columns which the
+        mappers read with different types are inferred.
+        """
+        dtypes = {}
+        conflicts = set()
+        for mapper in self.mapper_instances:
+            for column, dtype in mapper.get_source_dtypes().items():
+                if dtypes.setdefault(column, dtype) != dtype:
+                    conflicts.add(column)
+        dtypes.update(self.source_dtypes)
+        return {
+            column: dtype
+            for column, dtype in dtypes.items()
+            if column not in conflicts or column in self.source_dtypes
+        }
+
+    def get_mapper_rows(self, mapper: BaseModelMap, df: DataFrame) -> DataFrame:
+        """
+        Returns source rows of the chunk which are imported by the given
+        mapper, all of them by default.
+        """
+        return df
+
+    def map_dataframe(
+        self, df: DataFrame, rejected: RejectedRows = None
+    ) -> List[Tuple[BaseModelMap, List[dict]]]:
+        """
+        Maps source rows with each of the mappers, returns the mappers
+        along with their mapped rows.
+        """
+        return [
+            (mapper, mapper.map_dataframe(self.get_mapper_rows(mapper, df), rejected))
+            for mapper in self.get_bound_mappers()
+        ]
+
+    def get_row_count(self, dataset) -> int:
+        return sum(len(rows) for _, rows in dataset)
+
+    def add_to_dest_db(self, dataset, loader=None) -> None:
+        for mapper, rows in dataset:
+            mapper.add_to_dest_db(rows, loader=loader or self.loader)
@@ -0,0 +1,350 @@
+import itertools
+import json
+import os
+import platform
+import time
+from typing import Tuple
+
+import django
+import pandas as pd
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from .conf import DEFAULTS, get_setting
+from .journal import CheckpointJournal
+from .loaders import LOADERS
+from .rejects import RejectedRows
+from .services import BACKUP_DIR
+
+
+def benchmark_loaders(mapper_class, loaders=None, rows=None) -> dict:
+    """
+    Compares insert throughput of the loaders for given mapper.
+
+    Source table (or its first `rows` rows) is exported and mapped once,
+    then the same rows are inserted with each loader inside a transaction
+    which is rolled back, so rows of the mapper are not kept. Related
+    tables which are not imported yet are imported (and kept) while the
+    rows are mapped, rejected rows are not reported. Destination table
+    should be empty to avoid conflicts with existing rows. Empty source
+    table results in no measurements.
+    """
+    mapper = mapper_class()
+    chunks = mapper.iter_source_chunks(chunk_size=rows)
+    try:
+        frames = list(itertools.islice(chunks, 1 if rows else None))
+    finally:
+        # Source connection of `direct` mode is closed along with it.
+        chunks.close()
+    if all(df.empty for df in frames):
+        print(f"{mapper_class.sourcetable} has no rows to benchmark")
+        return {}
+    dataset = mapper.map_dataframe(pd.concat(frames), RejectedRows())
+
+    results = {}
+    for name in loaders or LOADERS:
+        loader = mapper.get_loader(name)
+        with transaction.atomic():
+            start = time.perf_counter()
+            loader.load(dataset)
+            seconds = time.perf_counter() - start
+            transaction.set_rollback(True)
+
+        results[name] = {
+            "rows": len(dataset),
+            "seconds": seconds,
+            "rows_per_sec": len(dataset) / seconds if seconds else None,
+        }
+        print(f"{name}: {len(dataset)} rows in {seconds:.3f}s")
+    return results
+
+
+# Numbers of rows of the synthetic source tables the suite runs with.
+BENCHMARK_SIZES = (10_000, 1_000_000, 10_000_000)
+
+# Synthetic source tables, shaped like the tables of `old/previous-db.sql`.
+SOURCE_TABLES = {
+    "mst_technology": "id BIGINT NOT NULL PRIMARY KEY, name VARCHAR(100) NOT NULL",
+    "developer": (
+        "id BIGINT NOT NULL PRIMARY KEY, "
+        "first_name VARCHAR(100) NOT NULL, "
+        "last_name VARCHAR(100) NOT NULL, "
+        "status BOOLEAN NOT NULL, "
+        "technology_id BIGINT NOT NULL"
+    ),
+    "team": "id BIGINT NOT NULL PRIMARY KEY, title VARCHAR(100) NOT NULL",
+    "team_members": (
+        "id BIGINT NOT NULL PRIMARY KEY, "
+        "developer_id BIGINT NOT NULL, "
+        "team_id BIGINT NOT NULL"
+    ),
+}
+
+
+def get_table_sizes(rows: int) -> dict:
+    """
+    Returns number of rows of each synthetic source table, `rows` is the
+    number of developers and team members.
+    """
+    return {
+        "mst_technology": min(rows, 100),
+        "developer": rows,
+        "team": max(rows // 100, 1),
+        "team_members": rows,
+    }
+
+
+def get_series_sql(connection, count: int) -> Tuple[str, list]:
+    """
+    Returns query which selects numbers from 1 to `count` as column `n`,
+    rows of the synthetic tables are generated from it by the database.
+    """
+    if connection.vendor == "postgresql":
+        return "SELECT CAST(generate_series(1, %s) AS BIGINT) AS n", [count]
+    return (
+        "WITH RECURSIVE series(n) AS "
+        "(SELECT 1 UNION ALL SELECT n + 1 FROM series WHERE n < %s) "
+        "SELECT n FROM series",
+        [count],
+    )
+
+
+def create_source_tables(rows: int, using: str = "source", replace=False) -> dict:
+    """
+    Creates synthetic source tables with `rows` developers and team
+    members. Values are derived from the row number, so the same tables
+    are generated on every run. Existing tables are only replaced if
+    `replace` is set, the benchmark is meant to run against a stand-in of
+    the source database.
+    """
+    connection = connections[using]
+    sizes = get_table_sizes(rows)
+    existing = set(connection.introspection.table_names())
+    selects = {
+        "mst_technology": "SELECT n, 'technology ' || n FROM ({0}) series",
+        "developer": (
+            "SELECT n, 'first name ' || n, 'last name ' || n, n %% 3 = 0, "
+            "(n * 7919) %% {technologies} + 1 FROM ({0}) series"
+        ),
+        "team": "SELECT n, 'team ' || n FROM ({0}) series",
+        "team_members": (
+            "SELECT n, (n * 104729) %% {developers} + 1, n %% {teams} + 1 "
+            "FROM ({0}) series"
+        ),
+    }
+
+    with connection.cursor() as cursor:
+        for table, columns in SOURCE_TABLES.items():
+            if table in existing:
+                if not replace:
+                    raise ValueError(
+                        "Source table '{0}' already exists (database: {1})".format(
+                            table, using
+                        )
+                    )
+                cursor.execute("DROP TABLE {0}".format(table))
+            cursor.execute("CREATE TABLE {0} ({1})".format(table, columns))
+
+            series, params = get_series_sql(connection, sizes[table])
+            select = selects[table].format(
+                series,
+                technologies=sizes["mst_technology"],
+                developers=sizes["developer"],
+                teams=sizes["team"],
+            )
+            cursor.execute("INSERT INTO {0} {1}".format(table, select), params)
+    return sizes
+
+
+def drop_source_tables(using: str = "source") -> None:
+    with connections[using].cursor() as cursor:
+        for table in reversed(list(SOURCE_TABLES)):
+            cursor.execute("DROP TABLE IF EXISTS {0}".format(table))
+
+
+def get_destination_tables(mappers_list) -> list:
+    """
+    Returns destination tables of the mappers and of the mappers they
+    depend on.
+    """
+    from .scripts import get_destination_models
+
+    return list(
+        dict.fromkeys(
+            model._meta.db_table for model in get_destination_models(mappers_list)
+        )
+    )
+
+
+def check_destination(mappers_list, using: str = "default") -> None:
+    """
+    Raises `ValueError` if any of the destination tables of the mappers
+    has rows, they would be removed by the benchmark.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for table in get_destination_tables(mappers_list):
+            cursor.execute(
+                "SELECT 1 FROM {0} LIMIT 1".format(connection.ops.quote_name(table))
+            )
+            if cursor.fetchone() is not None:
+                raise ValueError(
+                    "Destination table '{0}' is not empty (database: {1}), "
+                    "pass `flush=True` to remove its rows".format(table, using)
+                )
+
+
+def flush_destination(mappers_list, using: str = "default") -> None:
+    """
+    Removes all rows of the destination tables of the mappers (and of the
+    mappers they depend on).
+    """
+    connection = connections[using]
+    tables = get_destination_tables(mappers_list)
+    sql_list = connection.ops.sql_flush(no_style(), tables, reset_sequences=True)
+    connection.ops.execute_sql_flush(sql_list)
+
+
+def reset_benchmark_checkpoints(mappers_list) -> None:
+    """
+    Removes checkpoints of the mappers (and of the mappers they depend on),
+    checkpoints of other mappers are kept.
+    """
+    from .scheduler import Scheduler
+
+    journal = CheckpointJournal()
+    for mapper_class in Scheduler(mappers_list).get_graph():
+        journal.reset(mapper_class.get_mapper_name())
+
+
+def run_benchmark(
+    sizes=BENCHMARK_SIZES,
+    mappers_list=None,
+    output=None,
+    label=None,
+    replace=False,
+    flush=False,
+    **options,
+) -> dict:
+    """
+    Imports synthetic source tables of each size end to end with
+    `import_data` and records rows/sec, peak memory and time per stage of
+    every mapper. Results are written to `backups/benchmark-<label>.json`
+    (or `output`), so that runs of different versions can be compared
+    with `compare_benchmarks`.
+
+    Source tables are created in the `source` database and dropped once
+    the benchmark is done. Destination tables should be empty, rows which
+    they already have are only removed with `flush`. Rows imported by the
+    benchmark are removed before each size along with checkpoints of the
+    mappers. Options are passed to `import_data`.
+
+    Peak RSS is the peak of the whole process, run one size per process
+    to compare memory usage of different sizes.
+    """
+    from .base import DATASET, IMPORTED_TABLES
+    from .metrics import RUN_REPORT
+    from .scripts import import_data
+
+    if mappers_list is None:
+        from .mappers import mappers_list
+
+    if not flush:
+        check_destination(mappers_list)
+
+    label = label or time.strftime("%Y%m%d-%H%M%S")
+    report = {
+        "label": label,
+        "started": time.time(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "pandas": pd.__version__,
+        "source": connections["source"].vendor,
+        "destination": connections["default"].vendor,
+        "settings": {name: get_setting(name) for name in DEFAULTS},
+        "options": options,
+        "results": [],
+    }
+
+    created = False
+    try:
+        for rows in sizes:
+            print(f"Generating {rows} source rows...")
+            tables = create_source_tables(rows, replace=replace or created)
+            created = True
+            flush_destination(mappers_list)
+            if get_setting("CHECKPOINTS"):
+                reset_benchmark_checkpoints(mappers_list)
+            IMPORTED_TABLES.clear()
+            DATASET.clear()
+
+            start = time.perf_counter()
+            import_data(mappers_list, **options)
+            seconds = time.perf_counter() - start
+
+            run = RUN_REPORT.as_dict()
+            report["results"].append(
+                {
+                    "size": rows,
+                    "tables": tables,
+                    "rows": run["rows"],
+                    "seconds": round(seconds, 6),
+                    "rows_per_sec": round(run["rows"] / seconds, 1) if seconds else 0.0,
+                    "peak_rss": run["peak_rss"],
+                    "mappers": run["mappers"],
+                    "rebuilds": run["rebuilds"],
+                }
+            )
+            print(
+                f"{rows}: {run['rows']} rows in {seconds:.2f}s "
+                f"({run['rows'] / seconds:.0f} rows/sec)"
+            )
+    finally:
+        if created:
+            drop_source_tables()
+
+    output = output or os.path.join(BACKUP_DIR, f"benchmark-{label}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Benchmark results: {output}")
+    return report
+
+
+def compare_benchmarks(baseline: str, current: str) -> dict:
+    """
+    Compares rows/sec of two benchmark result files, returns (and prints)
+    ratio of current to baseline throughput for every size and mapper.
+    """
+    with open(baseline) as file:
+        old = json.load(file)
+    with open(current) as file:
+        new = json.load(file)
+
+    old_results = {result["size"]: result for result in old["results"]}
+    ratios = {}
+    for result in new["results"]:
+        previous = old_results.get(result["size"])
+        if previous is None:
+            continue
+        old_mappers = {
+            (data["sourcetable"], data["partition"]): data
+            for data in previous["mappers"]
+        }
+        sizes = {"total": get_ratio(previous, result)}
+        for data in result["mappers"]:
+            key = (data["sourcetable"], data["partition"])
+            if key in old_mappers:
+                sizes[data["sourcetable"]] = get_ratio(old_mappers[key], data)
+        ratios[result["size"]] = sizes
+
+        print(f"{result['size']} rows ({old['label']} -> {new['label']}):")
+        for name, ratio in sizes.items():
+            print(f"  {name}: {ratio:.2f}x" if ratio else f"  {name}: n/a")
+    return ratios
+
+
+def get_ratio(old: dict, new: dict):
+    if not old["rows_per_sec"]:
+        return None
+    return new["rows_per_sec"] / old["rows_per_sec"]
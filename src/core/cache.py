@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+from django.db import connections
+
+from .metrics import logger
+
+# Suffix of the file which describes a cached snapshot, it is kept next to
+# the snapshot file.
+META_SUFFIX = ".cache.json"
+
+# Snapshots used since the process started are not evicted, they may still
+# be read by other mappers of the current run.
+STARTED = time.time()
+
+
+class SnapshotCache:
+    """
+    Decides whether the snapshot file of an export can be reused instead of
+    exporting the source table again.
+
+    Snapshot is described by a key (hash of the export query, i.e. table,
+    exported columns, filters, partition and ordering, and of the snapshot
+    format) and by a fingerprint of the source table: number of exported
+    rows and their largest `source_pk`, on PostgreSQL also the number of
+    rows inserted, updated and deleted in the table so far. Both are
+    stored in `<snapshot>.cache.json` once the snapshot is written, the
+    snapshot is reused while they match.
+    """
+
+    def __init__(self, service) -> None:
+        self.service = service
+        self.path = service.get_file_path()
+
+    def get_meta_path(self) -> str:
+        return self.path + META_SUFFIX
+
+    def get_key(self) -> str:
+        query, params = self.service.get_query(connections["source"])
+        data = json.dumps([query, params, self.service.snapshot_format], default=str)
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def get_fingerprint(self) -> dict:
+        """
+        Returns fingerprint of the exported rows of the source table.
+        """
+        service = self.service
+        connection = connections["source"]
+        select = "COUNT(*)"
+        if service.source_pk:
+            select += ", MAX({0})".format(connection.ops.quote_name(service.source_pk))
+        where, params = service.get_where()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT {0} FROM {1}{2}".format(select, service.tablename, where),
+                params,
+            )
+            row = cursor.fetchone()
+            fingerprint = {"rows": row[0], "max_pk": row[1] if len(row) > 1 else None}
+
+            if connection.vendor == "postgresql":
+                # Counters also change when rows are updated in place.
+                cursor.execute(
+                    "SELECT n_tup_ins, n_tup_upd, n_tup_del FROM pg_stat_user_tables "
+                    "WHERE relid = to_regclass(%s)",
+                    [service.tablename],
+                )
+                stats = cursor.fetchone()
+                if stats is not None:
+                    fingerprint["changes"] = list(stats)
+
+        # Values are compared with the ones read back from JSON.
+        return json.loads(json.dumps(fingerprint, default=str))
+
+    def load(self) -> Optional[dict]:
+        try:
+            with open(self.get_meta_path()) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def is_valid(self, fingerprint: dict) -> bool:
+        """
+        Tells whether the snapshot file matches the export and the current
+        fingerprint of the source table.
+        """
+        meta = self.load()
+        return (
+            meta is not None
+            and os.path.exists(self.path)
+            and meta["key"] == self.get_key()
+            and meta["fingerprint"] == fingerprint
+            and meta["size"] == os.path.getsize(self.path)
+        )
+
+    def save(self, fingerprint: dict) -> None:
+        """
+        Records the snapshot file which has just been written.
+        """
+        now = time.time()
+        self.write(
+            {
+                "key": self.get_key(),
+                "table": self.service.tablename,
+                "fingerprint": fingerprint,
+                "size": os.path.getsize(self.path),
+                "created": now,
+                "used": now,
+            }
+        )
+
+    def touch(self) -> None:
+        """
+        Marks the snapshot as used, least recently used ones are evicted
+        first.
+        """
+        meta = self.load()
+        meta["used"] = time.time()
+        self.write(meta)
+
+    def write(self, meta: dict) -> None:
+        # Replaced at once, so that other processes never read a part of it.
+        temp_path = f"{self.get_meta_path()}.{os.getpid()}"
+        with open(temp_path, "w") as file:
+            json.dump(meta, file)
+        os.replace(temp_path, self.get_meta_path())
+
+    def invalidate(self) -> None:
+        """
+        Forgets the snapshot, e.g. before the snapshot file is rewritten.
+        """
+        if os.path.exists(self.get_meta_path()):
+            os.remove(self.get_meta_path())
+
+
+def get_cached_snapshots(directory: str) -> list:
+    """
+    Returns `(path, meta)` of the cached snapshots in the directory.
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    snapshots = []
+    for filename in os.listdir(directory):
+        if not filename.endswith(META_SUFFIX):
+            continue
+        meta_path = os.path.join(directory, filename)
+        try:
+            with open(meta_path) as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            continue
+        snapshots.append((meta_path[: -len(META_SUFFIX)], meta))
+    return snapshots
+
+
+def remove_snapshot(path: str) -> None:
+    for file_path in (path + META_SUFFIX, path):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def evict_snapshots(directory: str, max_size: int, keep=()) -> None:
+    """
+    Removes least recently used snapshots until cached snapshots in the
+    directory take at most `max_size` bytes. Snapshots in `keep` and the
+    ones used by the current run are not removed.
+    """
+    snapshots = [
+        (meta["used"], path, meta["size"])
+        for path, meta in get_cached_snapshots(directory)
+        if os.path.exists(path)
+    ]
+    total = sum(size for _, _, size in snapshots)
+    for used, path, size in sorted(snapshots):
+        if total <= max_size:
+            break
+        if path in keep or used >= STARTED:
+            continue
+        remove_snapshot(path)
+        total -= size
+        logger.info("Evicted snapshot %s (%d bytes)", path, size)
+
+
+def clear_snapshots(directory: str, tables=None) -> None:
+    """
+    Removes cached snapshots of the given source tables (or all of them),
+    so that the tables are exported again by the next import.
+    """
+    for path, meta in get_cached_snapshots(directory):
+        if tables is None or meta.get("table") in tables:
+            remove_snapshot(path)
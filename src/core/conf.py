@@ -0,0 +1,68 @@
+from django.conf import settings
+
+# Default values for keys which can be overridden from `settings.DB_MIGRATOR`.
+DEFAULTS = {
+    # Number of rows fetched from the source database per round trip.
+    "EXPORT_CHUNK_SIZE": 2000,
+    # Number of rows read, mapped and inserted at a time while importing.
+    "IMPORT_CHUNK_SIZE": 10000,
+    # Loader used to insert rows in the destination database.
+    "LOADER": "bulk_create",
+    # Way source rows are read: `snapshot` (through a snapshot file) or
+    # `direct`.
+    "SOURCE_MODE": "snapshot",
+    # Write snapshot of the source table in `direct` mode as well.
+    "KEEP_SNAPSHOT": False,
+    # Format of snapshot files: `csv` or `parquet` (requires pyarrow).
+    "SNAPSHOT_FORMAT": "csv",
+    # Read CSV snapshots with column types derived from destination fields.
+    "CSV_DTYPES": True,
+    # Parser of CSV snapshots: `c` (pandas) or `pyarrow` (requires pyarrow).
+    "CSV_ENGINE": "c",
+    # Reuse snapshot files while the source table does not change.
+    "SNAPSHOT_CACHE": False,
+    # Disk space (in MB) which cached snapshots can take, least recently
+    # used ones are removed beyond it.
+    "SNAPSHOT_CACHE_SIZE": 10240,
+    # Storage of primary keys used to resolve foreign keys: `memory` or
+    # `mmap` (memory-mapped file in the backups directory).
+    "KEY_INDEX": "memory",
+    # Memory (in MB) which SQLite uses to cache the key map of a table whose
+    # mapper does not preserve primary keys.
+    "KEY_MAP_CACHE_SIZE": 64,
+    # Number of mappers imported concurrently by `import_data_parallel`.
+    "WORKERS": 4,
+    # Pool used by `import_data_parallel`: `thread` or `process`.
+    "EXECUTOR": "thread",
+    # Record progress of imports in a journal table of the destination
+    # database, so that an interrupted import can be resumed.
+    "CHECKPOINTS": False,
+    # Read, map and load chunks of a table concurrently.
+    "PIPELINE": False,
+    # Maximum number of chunks waiting between two stages of the pipeline.
+    "PIPELINE_DEPTH": 2,
+    # Drop secondary indexes and foreign keys of destination tables while
+    # importing and rebuild them afterwards.
+    "FAST_LOAD": False,
+    # Reset sequences of destination tables whose primary keys are copied
+    # from the source tables once the import is done.
+    "RESET_SEQUENCES": True,
+    # Width of the primary key ranges (chunks) whose checksums are compared
+    # by `verify_data`, rows of the chunks which differ are compared one by
+    # one.
+    "VERIFY_CHUNK_SIZE": 10000,
+    # Write metrics of every imported mapper to `run_report.json` in the
+    # backups directory once the run is done.
+    "RUN_REPORT": True,
+}
+
+
+def get_setting(name: str):
+    """
+    Returns value of given key from `settings.DB_MIGRATOR`, falls back to
+    the default value if key is not configured.
+    """
+    user_settings = getattr(settings, "DB_MIGRATOR", {})
+    if name in user_settings:
+        return user_settings[name]
+    return DEFAULTS[name]
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+from pandas.core.frame import DataFrame
+from pandas.core.series import Series
+
+# Text values which are converted to booleans by `Cast(source, "bool")`.
+BOOLEAN_VALUES = {
+    "true": True,
+    "t": True,
+    "yes": True,
+    "y": True,
+    "1": True,
+    "1.0": True,
+    "false": False,
+    "f": False,
+    "no": False,
+    "n": False,
+    "0": False,
+    "0.0": False,
+}
+
+
+class Converter:
+    """
+    Derives a destination column from source columns of a whole chunk with
+    vectorized pandas operations, instead of calling a method of the
+    mapper for every row. Converters are passed to `MethodField` as
+    `converter` and can be nested: source of a converter is either a
+    source column or another converter.
+    """
+
+    def __init__(self, source) -> None:
+        self.source = source
+
+    def get_sources(self) -> list:
+        """
+        Returns source columns which are read by the converter.
+        """
+        return get_sources([self.source])
+
+    def get_column(self, df: DataFrame, source) -> Series:
+        if isinstance(source, Converter):
+            return source(df)
+        if source not in df.columns:
+            return Series(None, index=df.index, dtype=object)
+        return df[source]
+
+    def convert(self, df: DataFrame) -> Series:
+        raise NotImplementedError(
+            "'%s' should implement `convert` method" % self.__class__.__name__
+        )
+
+    def __call__(self, df: DataFrame) -> Series:
+        return self.convert(df)
+
+
+def get_sources(sources) -> list:
+    columns = []
+    for source in sources:
+        if isinstance(source, Converter):
+            columns.extend(source.get_sources())
+        else:
+            columns.append(source)
+    return columns
+
+
+class ValueMap(Converter):
+    """
+    Replaces values of the source column with the values of `mapping`,
+    e.g. booleans with `IntegerChoices`. Values which are not in the
+    mapping (including missing ones) are replaced with `default`.
+    """
+
+    def __init__(self, source, mapping: dict, default=None) -> None:
+        super().__init__(source)
+        self.mapping = mapping
+        self.default = default
+        # Keys are compared as python objects, so `1` matches `True`.
+        self.keys = pd.Index(list(mapping), dtype=object)
+        # Last item is used for values which are not in the mapping.
+        self.values = np.array(list(mapping.values()) + [default], dtype=object)
+
+    def convert(self, df: DataFrame) -> Series:
+        column = self.get_column(df, self.source)
+        # Values are picked by position, so their types are kept (e.g.
+        # integers are not turned into floats next to missing values).
+        positions = self.keys.get_indexer(column.astype(object))
+        return Series(self.values[positions], index=df.index, dtype=object)
+
+
+class Cast(Converter):
+    """
+    Converts values of the source column to another type: `int`, `float`,
+    `str`, `bool`, `date` or `datetime` (name or python type). Values which
+    cannot be converted become missing.
+    """
+
+    def __init__(self, source, to) -> None:
+        super().__init__(source)
+        self.to = to if isinstance(to, str) else to.__name__
+        if not hasattr(self, f"to_{self.to}"):
+            raise ValueError("Cannot cast values to '{0}'".format(self.to))
+
+    def convert(self, df: DataFrame) -> Series:
+        column = self.get_column(df, self.source)
+        return getattr(self, f"to_{self.to}")(column)
+
+    def to_int(self, column: Series) -> Series:
+        numbers = pd.to_numeric(column, errors="coerce")
+        return np.trunc(numbers).astype("Int64")
+
+    def to_float(self, column: Series) -> Series:
+        return pd.to_numeric(column, errors="coerce").astype(float)
+
+    def to_str(self, column: Series) -> Series:
+        return column.astype(str).where(column.notna(), None)
+
+    def to_bool(self, column: Series) -> Series:
+        text = column.astype(str).str.strip().str.lower()
+        return text.map(BOOLEAN_VALUES).where(column.notna(), None)
+
+    def to_datetime(self, column: Series) -> Series:
+        return pd.to_datetime(column, errors="coerce")
+
+    def to_date(self, column: Series) -> Series:
+        return self.to_datetime(column).dt.date
+
+
+class Concat(Converter):
+    """
+    Joins values of several source columns with `separator`, missing
+    values are skipped. The result is missing if all of the values are.
+    """
+
+    def __init__(self, sources: list, separator: str = " ") -> None:
+        super().__init__(None)
+        self.sources = sources
+        self.separator = separator
+
+    def get_sources(self) -> list:
+        return get_sources(self.sources)
+
+    def convert(self, df: DataFrame) -> Series:
+        result = Series(None, index=df.index, dtype=object)
+        for source in self.sources:
+            column = self.get_column(df, source)
+            present = column.notna()
+            text = column.astype(str)
+            joined = result.fillna("") + self.separator + text
+            result = result.mask(present, joined.where(result.notna(), text))
+        return result
+
+
+class Default(Converter):
+    """
+    Replaces missing values of the source column with `value`.
+    """
+
+    def __init__(self, source, value) -> None:
+        super().__init__(source)
+        self.value = value
+
+    def convert(self, df: DataFrame) -> Series:
+        column = self.get_column(df, self.source).astype(object)
+        return column.where(column.notna(), self.value)
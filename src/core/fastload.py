@@ -0,0 +1,180 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import connections
+
+from .conf import get_setting
+from .metrics import RUN_REPORT, logger
+
+
+class FastLoad:
+    """
+    Drops secondary indexes and foreign key constraints of destination
+    models before they are loaded and rebuilds them afterwards, so that
+    inserts do not maintain indexes and check constraints row by row.
+
+    Primary keys and unique constraints are kept. Indexes and constraints
+    are derived from the model's `_meta` and managed through the schema
+    editor, so `restore` only creates the ones which are missing and can
+    be run again after an interrupted import. Tables are rebuilt
+    concurrently (except on SQLite) and foreign keys are validated when
+    they are created.
+
+    SQLite cannot drop foreign key constraints, only indexes are dropped
+    there.
+    """
+
+    def __init__(self, models, using: str = "default", workers=None) -> None:
+        self.models = list(dict.fromkeys(models))
+        self.using = using
+        self.workers = workers or get_setting("WORKERS")
+        # Rebuild time of every table.
+        self.timings = {}
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def get_indexed_fields(self, model) -> list:
+        return [
+            field
+            for field in model._meta.local_concrete_fields
+            if field.db_index and not field.unique and not field.primary_key
+        ]
+
+    def get_foreign_keys(self, model) -> list:
+        return [
+            field
+            for field in model._meta.local_concrete_fields
+            if field.remote_field and field.db_constraint
+        ]
+
+    def get_field_index_names(self, editor, model, field) -> list:
+        return editor._constraint_names(
+            model,
+            [field.column],
+            index=True,
+            unique=False,
+            primary_key=False,
+            exclude=[index.name for index in model._meta.indexes],
+        )
+
+    def has_index(self, editor, model, index) -> bool:
+        return index.name in editor._constraint_names(model, index=True)
+
+    def drop_model(self, editor, model) -> dict:
+        dropped = {"indexes": 0, "foreign_keys": 0}
+        if editor.sql_create_fk:
+            for field in self.get_foreign_keys(model):
+                for name in editor._constraint_names(
+                    model, [field.column], foreign_key=True
+                ):
+                    editor.execute(editor._delete_fk_sql(model, name))
+                    dropped["foreign_keys"] += 1
+
+        for field in self.get_indexed_fields(model):
+            for name in self.get_field_index_names(editor, model, field):
+                editor.execute(editor._delete_index_sql(model, name))
+                dropped["indexes"] += 1
+
+        for index in model._meta.indexes:
+            if self.has_index(editor, model, index):
+                editor.remove_index(model, index)
+                dropped["indexes"] += 1
+        return dropped
+
+    def drop(self) -> None:
+        """
+        Drops secondary indexes and foreign keys of the models.
+        """
+        with self.connection.schema_editor() as editor:
+            for model in self.models:
+                dropped = self.drop_model(editor, model)
+                logger.info(
+                    "%s: dropped %d indexes and %d foreign keys",
+                    model._meta.db_table,
+                    dropped["indexes"],
+                    dropped["foreign_keys"],
+                )
+
+    def rebuild_model(self, model) -> dict:
+        """
+        Creates missing indexes and foreign keys of the model, returns
+        their number and the time it took.
+        """
+        start = time.perf_counter()
+        created = {"indexes": 0, "foreign_keys": 0}
+        with self.connection.schema_editor() as editor:
+            for field in self.get_indexed_fields(model):
+                if not self.get_field_index_names(editor, model, field):
+                    for sql in editor._field_indexes_sql(model, field):
+                        editor.execute(sql)
+                        created["indexes"] += 1
+
+            for index in model._meta.indexes:
+                if not self.has_index(editor, model, index):
+                    editor.add_index(model, index)
+                    created["indexes"] += 1
+
+            if editor.sql_create_fk:
+                for field in self.get_foreign_keys(model):
+                    if not editor._constraint_names(
+                        model, [field.column], foreign_key=True
+                    ):
+                        # Existing rows are validated by the database.
+                        editor.execute(
+                            editor._create_fk_sql(
+                                model, field, "_fk_%(to_table)s_%(to_column)s"
+                            )
+                        )
+                        created["foreign_keys"] += 1
+
+        self.connection.check_constraints(table_names=[model._meta.db_table])
+        created["seconds"] = round(time.perf_counter() - start, 6)
+        return created
+
+    def rebuild_model_in_thread(self, model) -> dict:
+        try:
+            return self.rebuild_model(model)
+        finally:
+            self.connection.close()
+
+    def restore(self) -> dict:
+        """
+        Rebuilds indexes and foreign keys of the models, returns the
+        rebuild timings by table. Timings are added to the run report.
+        """
+        if self.connection.vendor == "sqlite" or self.workers < 2:
+            results = [self.rebuild_model(model) for model in self.models]
+        else:
+            with ThreadPoolExecutor(self.workers) as pool:
+                results = list(pool.map(self.rebuild_model_in_thread, self.models))
+
+        for model, timing in zip(self.models, results):
+            table = model._meta.db_table
+            self.timings[table] = timing
+            RUN_REPORT.add_rebuild(table, timing)
+            logger.info(
+                "%s: rebuilt %d indexes and %d foreign keys in %.2fs",
+                table,
+                timing["indexes"],
+                timing["foreign_keys"],
+                timing["seconds"],
+            )
+        return self.timings
+
+
+@contextmanager
+def fast_load(models, using: str = "default"):
+    """
+    Drops secondary indexes and foreign keys of the models for the
+    duration of the block, see `FastLoad`. They are rebuilt even if the
+    block fails.
+    """
+    loader = FastLoad(models, using=using)
+    loader.drop()
+    try:
+        yield loader
+    finally:
+        loader.restore()
@@ -13,5 +13,27 @@ class ReferenceField(Field):
 
 
 class MethodField(Field):
-    def __init__(self, source=None, *args, **kwargs):
+    def __init__(self, source=None, sources=None, converter=None, *args, **kwargs):
         self.source = source
+        # Source columns which are read by the method, all columns of the
+        # source table are exported if neither `source` nor `sources` is set.
+        self.sources = sources
+        # Converter (see `converters`) or function which derives the whole
+        # column from a DataFrame of source rows, the mapper does not need
+        # a `get_<fieldname>_value` method then.
+        self.converter = converter
+        self.args = args
+        self.kwargs = kwargs
+
+    def get_sources(self):
+        """
+        Returns source columns which are read by the method, or `None` if
+        they are not known.
+        """
+        if self.sources is not None:
+            return list(self.sources)
+        if self.source is not None:
+            return [self.source]
+        if hasattr(self.converter, "get_sources"):
+            return self.converter.get_sources()
+        return None
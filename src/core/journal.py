@@ -0,0 +1,129 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.utils import timezone
+
+RUNNING = "running"
+COMPLETED = "completed"
+
+# Part of the journal row which keeps watermark of incremental syncs.
+SYNC = "sync"
+# Part of the journal row which keeps conditions of the partitions.
+PARTITIONS = "partitions"
+
+
+class CheckpointJournal:
+    """
+    Keeps progress of imports in a table of the destination database.
+
+    Each mapper (and each partition of a mapper) has one row with its
+    status, number of committed chunks and rows, and the watermark: the
+    last source primary key which is committed. Journal rows are written
+    in the same transaction as the chunk itself, so a restarted import
+    continues after the watermark without duplicating rows.
+
+    Incremental syncs keep the last value of the mapper's watermark
+    column in a separate row with `part` set to `sync`. Partitioned
+    imports keep conditions of their partitions in a row with `part` set
+    to `partitions`, so that a resumed import reads the same rows.
+    """
+
+    table = "dbmigrator_checkpoint"
+
+    def __init__(self, using: str = "default") -> None:
+        self.using = using
+        self.ensure_table()
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def quote_name(self, name: str) -> str:
+        return self.connection.ops.quote_name(name)
+
+    def ensure_table(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS {0} ("
+                "mapper VARCHAR(255) NOT NULL, "
+                "part VARCHAR(64) NOT NULL, "
+                "status VARCHAR(16) NOT NULL, "
+                "chunks INTEGER NOT NULL, "
+                "num_rows BIGINT NOT NULL, "
+                "watermark TEXT NULL, "
+                "updated_at VARCHAR(32) NOT NULL, "
+                "PRIMARY KEY (mapper, part))".format(self.quote_name(self.table))
+            )
+
+    def get(self, mapper: str, part: str = "") -> dict:
+        """
+        Returns checkpoint of the mapper, or `None` if it was never started.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT status, chunks, num_rows, watermark FROM {0} "
+                "WHERE mapper = %s AND part = %s".format(self.quote_name(self.table)),
+                [mapper, part],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        status, chunks, num_rows, watermark = row
+        return {
+            "status": status,
+            "chunks": chunks,
+            "rows": num_rows,
+            "watermark": json.loads(watermark) if watermark is not None else None,
+        }
+
+    def save(self, mapper: str, part: str, checkpoint: dict) -> None:
+        """
+        Creates or updates checkpoint of the mapper. It is executed within
+        the current transaction.
+        """
+        table = self.quote_name(self.table)
+        watermark = checkpoint.get("watermark")
+        values = [
+            checkpoint["status"],
+            checkpoint["chunks"],
+            checkpoint["rows"],
+            (
+                json.dumps(watermark, cls=DjangoJSONEncoder)
+                if watermark is not None
+                else None
+            ),
+            timezone.now().isoformat(),
+            mapper,
+            part,
+        ]
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE {0} SET status = %s, chunks = %s, num_rows = %s, "
+                "watermark = %s, updated_at = %s "
+                "WHERE mapper = %s AND part = %s".format(table),
+                values,
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    "INSERT INTO {0} "
+                    "(status, chunks, num_rows, watermark, updated_at, mapper, part) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s)".format(table),
+                    values,
+                )
+
+    def reset(self, mapper: str = None) -> None:
+        """
+        Removes checkpoints of the mapper (or of all mappers), so that the
+        next import starts from scratch.
+        """
+        with self.connection.cursor() as cursor:
+            if mapper is None:
+                cursor.execute("DELETE FROM {0}".format(self.quote_name(self.table)))
+            else:
+                cursor.execute(
+                    "DELETE FROM {0} WHERE mapper = %s".format(
+                        self.quote_name(self.table)
+                    ),
+                    [mapper],
+                )
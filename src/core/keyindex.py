@@ -0,0 +1,163 @@
+import itertools
+import os
+import threading
+from typing import Tuple
+
+import numpy as np
+
+from .conf import get_setting
+from .services import BACKUP_DIR
+
+INTEGER_FIELDS = (
+    "AutoField",
+    "BigAutoField",
+    "SmallAutoField",
+    "IntegerField",
+    "BigIntegerField",
+    "SmallIntegerField",
+    "PositiveIntegerField",
+    "PositiveBigIntegerField",
+    "PositiveSmallIntegerField",
+)
+
+
+class KeyIndex:
+    """
+    Sorted array of primary keys of a destination model. It is used to
+    resolve foreign keys without keeping model instances in memory.
+    Lookups use binary search, so they work for a single key as well as
+    for whole arrays of keys.
+    """
+
+    def __init__(self, keys: np.ndarray) -> None:
+        self.keys = keys
+
+    @classmethod
+    def get_dtype(cls, model):
+        if model._meta.pk.get_internal_type() in INTEGER_FIELDS:
+            return np.int64
+        return object
+
+    @classmethod
+    def iter_keys(cls, model, chunk_size: int):
+        return model._base_manager.values_list("pk", flat=True).iterator(
+            chunk_size=chunk_size
+        )
+
+    @classmethod
+    def from_model(cls, model, chunk_size: int = 10000) -> "KeyIndex":
+        keys = np.fromiter(cls.iter_keys(model, chunk_size), dtype=cls.get_dtype(model))
+        keys.sort()
+        return cls(keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def numeric(self) -> bool:
+        """
+        Tells whether keys are integers, source keys are converted to
+        numbers before they are looked up (e.g. `5.0` read from a CSV file).
+        """
+        return self.keys.dtype != object
+
+    def lookup(self, keys) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns boolean array which tells whether each of the given keys
+        is present in the index, and array of the stored keys (only valid
+        where the key is present).
+        """
+        keys = np.asarray(keys)
+        if not len(self.keys) or not len(keys):
+            return np.zeros(len(keys), dtype=bool), np.zeros(len(keys), self.keys.dtype)
+        positions = np.searchsorted(self.keys, keys)
+        positions[positions >= len(self.keys)] = 0
+        stored = self.keys[positions]
+        return stored == keys, stored
+
+    def contains(self, keys) -> np.ndarray:
+        """
+        Returns boolean array which tells whether each of the given keys
+        is present in the index.
+        """
+        return self.lookup(keys)[0]
+
+    def get(self, key):
+        """
+        Returns the stored key which equals to the given key (e.g. `5` for
+        `5.0`), or `None` if it is not present in the index.
+        """
+        if key is None or not len(self.keys):
+            return None
+        position = np.searchsorted(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return self.keys[position].item()
+        return None
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+
+class MmapKeyIndex(KeyIndex):
+    """
+    Key index stored in a memory-mapped file inside `BACKUP_DIR`, so that
+    keys of very large tables are paged in by the operating system instead
+    of being held in memory. Only integer primary keys are supported.
+
+    Index is written to a temporary file first and moved into place once
+    it is complete, so that indexes which are built at the same time (e.g.
+    by worker processes) do not write to the same file.
+    """
+
+    @classmethod
+    def get_file_path(cls, model) -> str:
+        return os.path.join(BACKUP_DIR, f"{model._meta.db_table}.keys")
+
+    @classmethod
+    def from_model(cls, model, chunk_size: int = 10000) -> "KeyIndex":
+        if cls.get_dtype(model) is object:
+            return KeyIndex.from_model(model, chunk_size)
+
+        count = model._base_manager.count()
+        if not count:
+            return cls(np.empty(0, dtype=np.int64))
+
+        file_path = cls.get_file_path(model)
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        keys = np.memmap(temp_path, dtype=np.int64, mode="w+", shape=(count,))
+        iterator = cls.iter_keys(model, chunk_size)
+        position = 0
+        # Rows which are added after counting them are not indexed.
+        while position < count:
+            size = min(chunk_size, count - position)
+            chunk = np.fromiter(itertools.islice(iterator, size), dtype=np.int64)
+            if not len(chunk):
+                break
+            keys[position : position + len(chunk)] = chunk
+            position += len(chunk)
+        keys = keys[:position]
+        keys.sort()
+        keys.flush()
+        os.replace(temp_path, file_path)
+        return cls(keys)
+
+
+KEY_INDEXES = {
+    "memory": KeyIndex,
+    "mmap": MmapKeyIndex,
+}
+
+
+def build_key_index(model) -> KeyIndex:
+    """
+    Returns key index of given model, storage of the index depends on the
+    `KEY_INDEX` setting.
+    """
+    name = get_setting("KEY_INDEX")
+    if name not in KEY_INDEXES:
+        raise ValueError(
+            "Unknown key index '{0}' (available: {1})".format(
+                name, ", ".join(KEY_INDEXES)
+            )
+        )
+    return KEY_INDEXES[name].from_model(model)
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import threading
+from typing import Tuple
+
+import numpy as np
+
+from .conf import get_setting
+from .services import BACKUP_DIR
+
+
+class KeyMap:
+    """
+    Translates source primary keys of a table to the primary keys which
+    the destination database assigned to the imported rows. It is used to
+    resolve reference fields of mappers which do not preserve primary
+    keys (`preserve_pk = False`).
+
+    Keys are kept in a SQLite database in `BACKUP_DIR`, so the map is not
+    limited by memory and can be reused by later runs and by other
+    processes. Memory used by SQLite is bounded by `KEY_MAP_CACHE_SIZE`
+    (in MB), lookups are made for a whole chunk of keys at once.
+    """
+
+    # Number of keys looked up by a single query.
+    batch_size = 500
+    # Source keys are compared as they are, see `KeyIndex.numeric`.
+    numeric = False
+
+    def __init__(self, sourcetable: str) -> None:
+        self.sourcetable = sourcetable
+        self.lock = threading.Lock()
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        self.connection = sqlite3.connect(
+            self.get_file_path(), timeout=60, check_same_thread=False
+        )
+        cache_size = get_setting("KEY_MAP_CACHE_SIZE") * 1024
+        self.connection.executescript(
+            "PRAGMA journal_mode = WAL;"
+            "PRAGMA synchronous = NORMAL;"
+            f"PRAGMA cache_size = -{cache_size};"
+            f"PRAGMA mmap_size = {cache_size * 1024};"
+            "CREATE TABLE IF NOT EXISTS keymap "
+            "(source_key PRIMARY KEY, dest_key NOT NULL) WITHOUT ROWID;"
+        )
+
+    def get_file_path(self) -> str:
+        return os.path.join(BACKUP_DIR, f"{self.sourcetable}.keymap.sqlite3")
+
+    def reset(self) -> None:
+        """
+        Removes keys of the previous import.
+        """
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM keymap")
+
+    def add(self, source_keys: list, dest_keys: list) -> None:
+        """
+        Stores destination keys of the given source keys, keys which are
+        already present are replaced.
+        """
+        rows = zip(
+            (self.to_python(key) for key in source_keys),
+            (self.to_python(key) for key in dest_keys),
+        )
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO keymap (source_key, dest_key) VALUES (?, ?)",
+                rows,
+            )
+
+    @staticmethod
+    def to_python(key):
+        return key.item() if hasattr(key, "item") else key
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Returns destination keys of the given source keys which are
+        present in the map.
+        """
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), self.batch_size):
+                batch = keys[start : start + self.batch_size]
+                cursor = self.connection.execute(
+                    "SELECT source_key, dest_key FROM keymap "
+                    "WHERE source_key IN ({0})".format(", ".join("?" * len(batch))),
+                    batch,
+                )
+                found.update(cursor.fetchall())
+        return found
+
+    def lookup(self, keys) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns boolean array which tells whether each of the given keys
+        is present in the map, and array of the destination keys (`None`
+        where the key is not present).
+        """
+        keys = [self.to_python(key) for key in keys]
+        found = self.get_many(list(set(keys)))
+        stored = np.array([found.get(key) for key in keys], dtype=object)
+        return np.array([key in found for key in keys], dtype=bool), stored
+
+    def get(self, key):
+        """
+        Returns destination key of the given source key, or `None` if it
+        is not present in the map.
+        """
+        if key is None:
+            return None
+        return self.get_many([self.to_python(key)]).get(self.to_python(key))
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM keymap").fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,229 @@
+import io
+import json
+from typing import List, Optional
+
+from django.db import NotSupportedError, connections, models, transaction
+from django.utils import timezone
+
+
+class BaseLoader:
+    """
+    Base class for loaders which write mapped rows to the destination
+    model. With `upsert`, rows whose primary key already exists in the
+    destination table are updated instead of inserted. With `return_keys`,
+    `load` returns primary keys which are assigned to the inserted rows.
+    """
+
+    def __init__(
+        self,
+        model,
+        using: str = "default",
+        upsert: bool = False,
+        return_keys: bool = False,
+    ) -> None:
+        self.model = model
+        self.using = using
+        self.upsert = upsert
+        self.return_keys = return_keys
+        # Size of the data sent to the database, if the loader knows it.
+        self.bytes_written = 0
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def get_update_fields(self, dataset: List[dict]) -> list:
+        """
+        Returns keys of the mapped rows which are updated on conflict,
+        i.e. all of them except the primary key.
+        """
+        pk = self.model._meta.pk
+        return [name for name in dataset[0] if name not in (pk.name, pk.attname)]
+
+    def load(self, dataset: List[dict]) -> Optional[list]:
+        raise NotImplementedError(
+            "'%s' should implement `load` method" % self.__class__.__name__
+        )
+
+
+class BulkCreateLoader(BaseLoader):
+    """
+    Creates model instances and inserts them using `bulk_create`.
+    """
+
+    batch_size = 1000
+
+    def load(self, dataset: List[dict]) -> Optional[list]:
+        features = self.connection.features
+        if self.return_keys and not features.can_return_rows_from_bulk_insert:
+            raise NotSupportedError(
+                "Database backend '{0}' does not return primary keys of "
+                "inserted rows, set `preserve_pk` of the mapper".format(
+                    self.connection.vendor
+                )
+            )
+
+        dest_objects = []
+        for data in dataset:
+            dest_objects.append(self.model(**data))
+        options = {}
+        if self.upsert and dataset:
+            update_fields = self.get_update_fields(dataset)
+            if update_fields:
+                options = {
+                    "update_conflicts": True,
+                    "unique_fields": [self.model._meta.pk.name],
+                    "update_fields": update_fields,
+                }
+            else:
+                options = {"ignore_conflicts": True}
+        self.model.objects.using(self.using).bulk_create(
+            dest_objects,
+            batch_size=self.batch_size,
+            **options,
+        )
+        if self.return_keys:
+            return [dest_object.pk for dest_object in dest_objects]
+        return None
+
+
+class CopyLoader(BaseLoader):
+    """
+    Streams rows into the destination table using PostgreSQL
+    `COPY ... FROM STDIN`. Model instances are not created, so `save()`
+    and signals are skipped. Falls back to `BulkCreateLoader` for other
+    database backends.
+
+    Upserts copy rows into a temporary table first, then move them to the
+    destination table with `INSERT ... ON CONFLICT DO UPDATE`. COPY does
+    not return primary keys, `BulkCreateLoader` is used if they are needed.
+    """
+
+    def get_fields(self, dataset: List[dict]) -> list:
+        """
+        Returns model fields for the keys of the mapped rows.
+        """
+        return [self.model._meta.get_field(name) for name in dataset[0]]
+
+    def get_db_value(self, field, value):
+        """
+        Converts python value to the value which is written to the COPY
+        stream.
+        """
+        if value is None and (
+            getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+        ):
+            value = timezone.now()
+        if value is None:
+            return None
+        if isinstance(value, models.Model):
+            value = value.pk
+        if isinstance(field, models.JSONField):
+            return json.dumps(value, cls=field.encoder)
+        return field.get_db_prep_save(value, connection=self.connection)
+
+    def format_value(self, value) -> str:
+        """
+        Returns CSV representation of the value. Unquoted empty value is
+        read as NULL by COPY, other values are always quoted.
+        """
+        if value is None:
+            return ""
+        return '"' + str(value).replace('"', '""') + '"'
+
+    def get_copy_sql(self, fields: list, table: str = None) -> str:
+        quote_name = self.connection.ops.quote_name
+        return "COPY {0} ({1}) FROM STDIN WITH (FORMAT csv)".format(
+            quote_name(table or self.model._meta.db_table),
+            ", ".join(quote_name(field.column) for field in fields),
+        )
+
+    def get_upsert_sql(self, fields: list, table: str) -> str:
+        quote_name = self.connection.ops.quote_name
+        pk = self.model._meta.pk
+        columns = ", ".join(quote_name(field.column) for field in fields)
+        updates = ", ".join(
+            "{0} = EXCLUDED.{0}".format(quote_name(field.column))
+            for field in fields
+            if field.column != pk.column
+        )
+        return (
+            "INSERT INTO {0} ({1}) SELECT {1} FROM {2} "
+            "ON CONFLICT ({3}) DO {4}".format(
+                quote_name(self.model._meta.db_table),
+                columns,
+                quote_name(table),
+                quote_name(pk.column),
+                f"UPDATE SET {updates}" if updates else "NOTHING",
+            )
+        )
+
+    def write_rows(self, dataset: List[dict], fields: list) -> io.StringIO:
+        buffer = io.StringIO()
+        for data in dataset:
+            values = [
+                self.format_value(self.get_db_value(field, value))
+                for field, value in zip(fields, data.values())
+            ]
+            buffer.write(",".join(values) + "\n")
+        buffer.seek(0)
+        return buffer
+
+    def copy(self, cursor, sql: str, buffer: io.StringIO) -> None:
+        if hasattr(cursor.cursor, "copy_expert"):
+            # psycopg2
+            cursor.cursor.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with cursor.cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+    def load(self, dataset: List[dict]) -> Optional[list]:
+        if self.connection.vendor != "postgresql" or self.return_keys:
+            return BulkCreateLoader(
+                self.model,
+                using=self.using,
+                upsert=self.upsert,
+                return_keys=self.return_keys,
+            ).load(dataset)
+        if not dataset:
+            return None
+
+        fields = self.get_fields(dataset)
+        buffer = self.write_rows(dataset, fields)
+        self.bytes_written += len(buffer.getvalue().encode())
+
+        if not self.upsert:
+            with self.connection.cursor() as cursor:
+                self.copy(cursor, self.get_copy_sql(fields), buffer)
+            return None
+
+        quote_name = self.connection.ops.quote_name
+        table = f"{self.model._meta.db_table}_upsert"
+        with transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE {0} (LIKE {1} INCLUDING DEFAULTS)".format(
+                    quote_name(table), quote_name(self.model._meta.db_table)
+                )
+            )
+            self.copy(cursor, self.get_copy_sql(fields, table), buffer)
+            cursor.execute(self.get_upsert_sql(fields, table))
+            cursor.execute("DROP TABLE {0}".format(quote_name(table)))
+        return None
+
+
+LOADERS = {
+    "bulk_create": BulkCreateLoader,
+    "copy": CopyLoader,
+}
+
+
+def get_loader_class(name: str):
+    """
+    Returns loader class registered with the given name.
+    """
+    if name not in LOADERS:
+        raise ValueError(
+            "Unknown loader '{0}' (available: {1})".format(name, ", ".join(LOADERS))
+        )
+    return LOADERS[name]
@@ -1,6 +1,7 @@
 from demoapp import models
 
 from .base import BaseModelMap
+from .converters import ValueMap
 from .fields import MethodField, ReferenceField
 
 
@@ -15,14 +16,15 @@ class DeveloperMapper(BaseModelMap):
     sourcetable = "developer"
     exclude_fields = ["about"]
 
-    status = MethodField()
+    status = MethodField(
+        converter=ValueMap(
+            "status",
+            {True: models.DeveloperStatusChoice.active},
+            default=models.DeveloperStatusChoice.inactive,
+        )
+    )
     technology = ReferenceField(mapper=TechnologyMapper, source="technology_id")
 
-    def get_status_value(self, row):
-        if row["status"]:
-            return models.DeveloperStatusChoice.active
-        return models.DeveloperStatusChoice.inactive
-
 
 class TeamMapper(BaseModelMap):
     destmodel = models.Team
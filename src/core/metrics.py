@@ -0,0 +1,292 @@
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger("dbmigrator")
+
+# Stages of the import of a mapper in the order they happen.
+STAGES = ("export", "write", "parse", "resolve", "map", "load")
+
+# Functions which are called with metrics of every imported mapper.
+HOOKS = []
+
+
+def add_hook(func):
+    """
+    Registers a function which is called with metrics of every imported
+    mapper (a dict, see `MapperMetrics.as_dict`), e.g. to send them to a
+    metrics system. Hooks are called in the process which imports the
+    mapper. Can be used as a decorator.
+    """
+    HOOKS.append(func)
+    return func
+
+
+def remove_hook(func) -> None:
+    HOOKS.remove(func)
+
+
+def get_peak_rss() -> int:
+    """
+    Returns peak resident set size of the process in bytes, or `None` if
+    it is not available on the platform.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class QueryCounter:
+    """
+    Database execute wrapper which counts executed queries.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class StageMetrics:
+    """
+    Totals of a single stage, accumulated over all chunks.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.seconds = 0.0
+        self.rows = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.queries = 0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "seconds": round(self.seconds, 6),
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows_per_sec, 1),
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "queries": self.queries,
+        }
+
+
+class MapperMetrics:
+    """
+    Collects wall time, rows, bytes and number of queries of each stage
+    of the import of a mapper (or of one partition of its source table):
+
+    - `export`: fetching rows from the source database
+    - `write`: writing the snapshot file
+    - `parse`: reading the snapshot file (or building DataFrames of
+      fetched rows in `direct` mode)
+    - `resolve`: resolving reference fields
+    - `map`: deriving the rest of destination fields
+    - `load`: inserting rows in the destination database
+
+    Stages of a chunk run one after another, so their times add up to the
+    time of the import (import of a related mapper which is started while
+    resolving reference fields is counted in `resolve`). With `PIPELINE`
+    setting, stages of different chunks overlap.
+    """
+
+    def __init__(self, sourcetable: str, partition=None) -> None:
+        self.sourcetable = sourcetable
+        self.partition = partition
+        self.stages = {}
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.rows = 0
+        self.rejected = 0
+        # Number of rejected values as `{"<field>:<reason>": count}`.
+        self.reject_reasons = {}
+        self.peak_rss = None
+
+    def get_stage(self, name: str) -> StageMetrics:
+        if name not in self.stages:
+            self.stages[name] = StageMetrics(name)
+        return self.stages[name]
+
+    @contextmanager
+    def measure(self, stage: str, *extra_connections):
+        """
+        Adds time and queries of the enclosed block to the stage. Queries
+        are counted on the `default` and `source` connections of the
+        current thread and on the given connections. Yields the stage, so
+        that rows and bytes can be added to it.
+        """
+        metrics = self.get_stage(stage)
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in (connections["default"], connections["source"]):
+                stack.enter_context(connection.execute_wrapper(counter))
+            for connection in extra_connections:
+                stack.enter_context(connection.execute_wrapper(counter))
+            start = time.perf_counter()
+            try:
+                yield metrics
+            finally:
+                metrics.seconds += time.perf_counter() - start
+                metrics.queries += counter.count
+
+    def measure_iter(self, stage: str, iterable, *extra_connections):
+        """
+        Yields items of the iterable, time of producing each item and its
+        length (number of rows) are added to the stage.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.measure(stage, *extra_connections) as metrics:
+                item = next(iterator, None)
+                if item is not None:
+                    metrics.rows += len(item)
+            if item is None:
+                return
+            yield item
+
+    def finish(self, rows: int, rejected: int = 0, reject_reasons=None) -> None:
+        """
+        Records totals of the import, logs metrics of each stage, calls
+        hooks and adds the metrics to the run report.
+        """
+        self.seconds = time.perf_counter() - self.started
+        self.rows = rows
+        self.rejected = rejected
+        self.reject_reasons = reject_reasons or {}
+        self.peak_rss = get_peak_rss()
+
+        self.log()
+        data = self.as_dict()
+        for hook in HOOKS:
+            hook(data)
+        RUN_REPORT.add(data)
+
+    @property
+    def name(self) -> str:
+        if self.partition:
+            return f"{self.sourcetable} ({self.partition.name})"
+        return self.sourcetable
+
+    def log(self) -> None:
+        rows_per_sec = self.rows / self.seconds if self.seconds else 0
+        logger.info(
+            "%s: %d rows in %.2fs (%.0f rows/sec), %d rejected, peak RSS %s",
+            self.name,
+            self.rows,
+            self.seconds,
+            rows_per_sec,
+            self.rejected,
+            f"{self.peak_rss / 2**20:.1f} MB" if self.peak_rss else "n/a",
+        )
+        if self.reject_reasons:
+            logger.info(
+                "%s: rejected values %s",
+                self.name,
+                ", ".join(
+                    f"{reason} {count}" for reason, count in self.reject_reasons.items()
+                ),
+            )
+        for name in sorted(self.stages, key=self.get_stage_order):
+            stage = self.stages[name]
+            logger.info(
+                "%s [%s]: %.2fs, %d rows (%.0f rows/sec), %d bytes read, "
+                "%d bytes written, %d queries",
+                self.name,
+                name,
+                stage.seconds,
+                stage.rows,
+                stage.rows_per_sec,
+                stage.bytes_read,
+                stage.bytes_written,
+                stage.queries,
+                extra={
+                    "metrics": {"mapper": self.name, "stage": name, **stage.as_dict()}
+                },
+            )
+
+    @staticmethod
+    def get_stage_order(name: str) -> int:
+        return STAGES.index(name) if name in STAGES else len(STAGES)
+
+    def as_dict(self) -> dict:
+        return {
+            "sourcetable": self.sourcetable,
+            "partition": self.partition.name if self.partition else None,
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "reject_reasons": self.reject_reasons,
+            "seconds": round(self.seconds, 6),
+            "rows_per_sec": round(self.rows / self.seconds, 1) if self.seconds else 0.0,
+            "peak_rss": self.peak_rss,
+            "stages": {
+                name: self.stages[name].as_dict()
+                for name in sorted(self.stages, key=self.get_stage_order)
+            },
+        }
+
+
+class RunReport:
+    """
+    Metrics of all mappers imported in the current run, written as JSON
+    once the run is done.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = time.time()
+        self.mappers = {}
+        # Time it took to rebuild indexes by table, see `FastLoad`.
+        self.rebuilds = {}
+
+    def add(self, data: dict) -> None:
+        """
+        Adds metrics of a mapper, metrics of a previous import of the same
+        mapper (and partition) are replaced.
+        """
+        with self.lock:
+            self.mappers[(data["sourcetable"], data["partition"])] = data
+
+    def add_rebuild(self, table: str, data: dict) -> None:
+        with self.lock:
+            self.rebuilds[table] = data
+
+    def as_dict(self) -> dict:
+        mappers = list(self.mappers.values())
+        return {
+            "started": self.started,
+            "seconds": round(time.time() - self.started, 6),
+            "rows": sum(data["rows"] for data in mappers),
+            "rejected": sum(data["rejected"] for data in mappers),
+            "peak_rss": get_peak_rss(),
+            "mappers": mappers,
+            "rebuilds": self.rebuilds,
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.as_dict(), file, indent=2)
+
+
+# Report of the current run.
+RUN_REPORT = RunReport()
@@ -0,0 +1,132 @@
+from typing import List, Optional
+
+from django.db import connections
+
+from .journal import COMPLETED, PARTITIONS, CheckpointJournal
+
+
+class Partition:
+    """
+    Subset of rows of a source table described by a `WHERE` clause. Each
+    partition is exported, mapped and loaded separately.
+    """
+
+    def __init__(self, index: int, count: int, where: str, params=None) -> None:
+        self.index = index
+        self.count = count
+        self.where = where
+        self.params = params or []
+
+    @property
+    def name(self) -> str:
+        """
+        Returns name which is used as a suffix of snapshot files.
+        """
+        return f"part{self.index + 1}of{self.count}"
+
+    def __repr__(self) -> str:
+        return "<Partition {0}: {1} {2}>".format(self.name, self.where, self.params)
+
+
+def get_range_partitions(tablename: str, pk: str, count: int) -> List[Partition]:
+    """
+    Splits the table into at most `count` ranges of primary keys. Range
+    boundaries are picked by row offsets instead of splitting the values
+    between min and max key, so that ranges have roughly the same number
+    of rows even if keys are skewed. Empty table results in a single
+    partition.
+    """
+    conn = connections.create_connection("source")
+    quote_name = conn.ops.quote_name
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM {0}".format(tablename))
+            rows = cursor.fetchone()[0]
+
+            count = max(min(count, rows), 1)
+            boundaries = []
+            for index in range(1, count):
+                cursor.execute(
+                    "SELECT {0} FROM {1} ORDER BY {0} LIMIT 1 OFFSET %s".format(
+                        quote_name(pk), tablename
+                    ),
+                    [index * rows // count],
+                )
+                boundary = cursor.fetchone()[0]
+                if boundary not in boundaries:
+                    boundaries.append(boundary)
+    finally:
+        conn.close()
+
+    column = quote_name(pk)
+    total = len(boundaries) + 1
+    if not boundaries:
+        return [Partition(0, 1, "", [])]
+
+    partitions = [Partition(0, total, f"{column} < %s", [boundaries[0]])]
+    for index, (low, high) in enumerate(zip(boundaries, boundaries[1:]), start=1):
+        partitions.append(
+            Partition(index, total, f"{column} >= %s AND {column} < %s", [low, high])
+        )
+    partitions.append(Partition(total - 1, total, f"{column} >= %s", [boundaries[-1]]))
+    return partitions
+
+
+def get_hash_partitions(pk: str, count: int) -> List[Partition]:
+    """
+    Splits the table into `count` partitions by the remainder of integer
+    primary key.
+    """
+    column = connections["source"].ops.quote_name(pk)
+    return [
+        Partition(index, count, f"{column} %% %s = %s", [count, index])
+        for index in range(count)
+    ]
+
+
+def get_partitions(mapper_class) -> Optional[List[Partition]]:
+    """
+    Returns partitions of the mapper's source table, or `None` if the
+    mapper does not define `partitions`.
+    """
+    if not mapper_class.partitions or mapper_class.partitions < 2:
+        return None
+    if mapper_class.partition_by == "range":
+        return get_range_partitions(
+            mapper_class.sourcetable, mapper_class.source_pk, mapper_class.partitions
+        )
+    if mapper_class.partition_by == "hash":
+        return get_hash_partitions(mapper_class.source_pk, mapper_class.partitions)
+    raise ValueError(
+        "Unknown partition strategy '{0}' (source: {1})".format(
+            mapper_class.partition_by, mapper_class.__name__
+        )
+    )
+
+
+def save_partitions(mapper_class, partitions: List[Partition]) -> None:
+    """
+    Stores conditions of the partitions in the checkpoint journal.
+    """
+    checkpoint = {
+        "status": COMPLETED,
+        "chunks": 0,
+        "rows": 0,
+        "watermark": [[partition.where, partition.params] for partition in partitions],
+    }
+    CheckpointJournal().save(mapper_class.get_mapper_name(), PARTITIONS, checkpoint)
+
+
+def load_partitions(mapper_class) -> Optional[List[Partition]]:
+    """
+    Returns partitions stored in the checkpoint journal by the last import
+    of the mapper, or `None` if they were not stored.
+    """
+    checkpoint = CheckpointJournal().get(mapper_class.get_mapper_name(), PARTITIONS)
+    if checkpoint is None:
+        return None
+    conditions = checkpoint["watermark"]
+    return [
+        Partition(index, len(conditions), where, params)
+        for index, (where, params) in enumerate(conditions)
+    ]
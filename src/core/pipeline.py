@@ -0,0 +1,124 @@
+import queue
+import threading
+
+from django.db import connections
+
+# Marks the end of items of a stage.
+DONE = object()
+
+
+class StageError:
+    """
+    Exception raised by a stage, it is re-raised by the consumer.
+    """
+
+    def __init__(self, exception: BaseException) -> None:
+        self.exception = exception
+
+
+class Stage:
+    """
+    Iterates over an iterable in a separate thread and hands its items
+    over through a bounded queue. The thread blocks once the queue is
+    full, so at most `depth` items wait for the next stage.
+    """
+
+    # Seconds between checks whether the pipeline is stopped.
+    poll_interval = 0.1
+
+    def __init__(self, iterable, depth: int, stopped: threading.Event) -> None:
+        self.iterable = iterable
+        self.queue = queue.Queue(maxsize=depth)
+        self.stopped = stopped
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def put(self, item) -> bool:
+        """
+        Puts the item in the queue, returns `False` if the pipeline is
+        stopped meanwhile.
+        """
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=self.poll_interval)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self) -> None:
+        try:
+            for item in self.iterable:
+                if not self.put(item):
+                    break
+            else:
+                self.put(DONE)
+        except BaseException as e:
+            self.put(StageError(e))
+        finally:
+            # Generators release their resources (e.g. source cursors) in
+            # the thread they are running in.
+            close = getattr(self.iterable, "close", None)
+            if close is not None:
+                close()
+            connections.close_all()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                if self.stopped.is_set():
+                    raise StopIteration
+                continue
+            if item is DONE:
+                raise StopIteration
+            if isinstance(item, StageError):
+                raise item.exception
+            return item
+
+    def join(self) -> None:
+        self.thread.join()
+
+
+class Pipeline:
+    """
+    Chain of stages which run concurrently, each one in its own thread and
+    with its own database connections. Stages are connected by bounded
+    queues (`depth` items at most), so a fast stage waits for the slow
+    one instead of piling up chunks in memory.
+
+    Once the pipeline is closed (or the consumer fails), all of the stages
+    are stopped and their threads are joined.
+    """
+
+    def __init__(self, depth: int) -> None:
+        self.depth = max(depth, 1)
+        self.stopped = threading.Event()
+        self.stages = []
+
+    def add(self, iterable) -> Stage:
+        """
+        Starts iterating over the iterable in a new stage, returns the
+        stage which yields its items.
+        """
+        stage = Stage(iterable, self.depth, self.stopped)
+        self.stages.append(stage)
+        stage.start()
+        return stage
+
+    def close(self) -> None:
+        self.stopped.set()
+        for stage in reversed(self.stages):
+            stage.join()
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,225 @@
+from typing import Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+
+from . import fields
+
+
+class FieldRule:
+    """
+    Describes how the value of a single destination field is derived from
+    the source data. A tuple of rules (field plan) is compiled once per
+    mapper class and applied to whole DataFrame columns.
+    """
+
+    __slots__ = ("name", "kind", "source", "field", "attname")
+
+    EXCLUDE = "exclude"
+    RENAME = "rename"
+    METHOD = "method"
+    CONVERT = "convert"
+    REFERENCE = "reference"
+    PASSTHROUGH = "passthrough"
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        source: Optional[str] = None,
+        field: Optional[fields.Field] = None,
+        attname: Optional[str] = None,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.source = source
+        self.field = field
+        # Key of the value in mapped rows, e.g. `<field>_id` for references.
+        self.attname = attname or name
+
+    def __repr__(self) -> str:
+        return "<FieldRule {0}: {1} ({2})>".format(self.name, self.kind, self.source)
+
+
+# Pandas types of source columns by internal type of their destination
+# field, used while reading CSV snapshots. `datetime` columns are parsed as
+# timestamps, types of the other columns are inferred.
+SOURCE_DTYPES = {
+    "AutoField": "Int64",
+    "BigAutoField": "Int64",
+    "SmallAutoField": "Int64",
+    "IntegerField": "Int64",
+    "BigIntegerField": "Int64",
+    "SmallIntegerField": "Int64",
+    "PositiveIntegerField": "Int64",
+    "PositiveBigIntegerField": "Int64",
+    "PositiveSmallIntegerField": "Int64",
+    "BooleanField": "boolean",
+    "FloatField": "Float64",
+    # Decimals are kept as text, so that they are not rounded.
+    "DecimalField": "string",
+    "CharField": "string",
+    "TextField": "string",
+    "SlugField": "string",
+    "UUIDField": "string",
+    "DateField": "datetime",
+    "DateTimeField": "datetime",
+}
+
+
+def compile_dtype_plan(mapper) -> dict:
+    """
+    Returns pandas types of the source columns which are copied to the
+    destination fields (as they are, renamed or as foreign keys), derived
+    from the types of the destination fields.
+    """
+    opts = mapper.destmodel._meta
+    dtypes = {}
+    for rule in mapper.get_field_plan():
+        if rule.kind not in (
+            FieldRule.PASSTHROUGH,
+            FieldRule.RENAME,
+            FieldRule.REFERENCE,
+        ):
+            continue
+        field = opts.get_field(rule.name)
+        if field.primary_key and not mapper.preserve_pk:
+            # Source keys do not need to have the type of the primary key.
+            continue
+        if rule.kind == FieldRule.REFERENCE:
+            if not rule.field.mapper.preserve_pk:
+                continue
+            field = field.target_field
+        dtype = SOURCE_DTYPES.get(field.get_internal_type())
+        if rule.source and dtype is not None:
+            dtypes[rule.source] = dtype
+    return dtypes
+
+
+def compile_field_plan(mapper) -> Tuple[FieldRule, ...]:
+    """
+    Returns tuple of `FieldRule` for the given mapper. Precedence of rules
+    is same as before: excluded fields, renamed columns, method fields,
+    reference fields and finally plain columns.
+    """
+    plan = []
+    for name, fieldval in mapper.get_fields().items():
+        if name in mapper.exclude_fields:
+            rule = FieldRule(name, FieldRule.EXCLUDE)
+        elif name in mapper.renamed_columns:
+            rule = FieldRule(name, FieldRule.RENAME, mapper.renamed_columns[name])
+        elif isinstance(fieldval, fields.MethodField):
+            kind = FieldRule.METHOD
+            if fieldval.converter is not None:
+                kind = FieldRule.CONVERT
+            rule = FieldRule(name, kind, fieldval.source, fieldval)
+        elif isinstance(fieldval, fields.ReferenceField):
+            attname = mapper.destmodel._meta.get_field(name).attname
+            rule = FieldRule(
+                name, FieldRule.REFERENCE, fieldval.source, fieldval, attname
+            )
+        else:
+            rule = FieldRule(name, FieldRule.PASSTHROUGH, fieldval.source, fieldval)
+        plan.append(rule)
+    return tuple(plan)
+
+
+def check_mapper(mapper_class) -> None:
+    """
+    Raises `ImproperlyConfigured` if the mapper refers to fields which are
+    not present in its destination model, or if a field of the mapper
+    cannot be derived.
+    """
+    opts = mapper_class.destmodel._meta
+
+    def get_field(name, option):
+        try:
+            return opts.get_field(name)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(
+                "'{0}' in `{1}` is not a field of {2} (source: {3})".format(
+                    name, option, opts.label, mapper_class.__name__
+                )
+            )
+
+    for name in mapper_class.exclude_fields:
+        get_field(name, "exclude_fields")
+    if opts.pk.name in mapper_class.exclude_fields:
+        # Without `preserve_pk`, source keys are needed for the key map.
+        raise ImproperlyConfigured(
+            "Primary key '{0}' cannot be excluded, it holds the source key "
+            "(source: {1})".format(opts.pk.name, mapper_class.__name__)
+        )
+    for name in mapper_class.renamed_columns:
+        get_field(name, "renamed_columns")
+
+    for name, fieldval in vars(mapper_class).items():
+        if not isinstance(fieldval, fields.Field):
+            continue
+        field = get_field(name, "fields")
+        if isinstance(fieldval, fields.ReferenceField):
+            if not (field.many_to_one or field.one_to_one):
+                raise ImproperlyConfigured(
+                    "ReferenceField '{0}' should be a foreign key of {1} "
+                    "(source: {2})".format(name, opts.label, mapper_class.__name__)
+                )
+            if getattr(fieldval.mapper, "destmodel", None) is None:
+                raise ImproperlyConfigured(
+                    "ReferenceField '{0}' should refer to a mapper class "
+                    "(source: {1})".format(name, mapper_class.__name__)
+                )
+        elif isinstance(fieldval, fields.MethodField):
+            if fieldval.converter is not None:
+                if not callable(fieldval.converter):
+                    raise ImproperlyConfigured(
+                        "Converter of MethodField '{0}' should be callable "
+                        "(source: {1})".format(name, mapper_class.__name__)
+                    )
+            elif not (
+                hasattr(mapper_class, f"get_{name}_value")
+                or hasattr(mapper_class, f"get_{name}_values")
+            ):
+                raise ImproperlyConfigured(
+                    "Add `get_{0}_value` or `get_{0}_values` method for "
+                    "MethodField '{0}' (source: {1})".format(
+                        name, mapper_class.__name__
+                    )
+                )
+
+
+def check_fanout(fanout_class) -> None:
+    """
+    Raises `ImproperlyConfigured` if mappers of the fan-out do not read its
+    source table or refer to each other.
+    """
+    for mapper_class in fanout_class.mappers:
+        if getattr(mapper_class, "destmodel", None) is None:
+            raise ImproperlyConfigured(
+                "'{0}' in `mappers` should be a mapper of a destination model "
+                "(source: {1})".format(mapper_class.__name__, fanout_class.__name__)
+            )
+        if mapper_class.sourcetable != fanout_class.sourcetable:
+            raise ImproperlyConfigured(
+                "'{0}' in `mappers` should import '{1}' table (source: {2})".format(
+                    mapper_class.__name__,
+                    fanout_class.sourcetable,
+                    fanout_class.__name__,
+                )
+            )
+        if mapper_class.fanout not in (None, fanout_class):
+            raise ImproperlyConfigured(
+                "'{0}' in `mappers` is already imported by {1} (source: {2})".format(
+                    mapper_class.__name__,
+                    mapper_class.fanout.__name__,
+                    fanout_class.__name__,
+                )
+            )
+        for referenced in mapper_class.get_referenced_mappers():
+            if referenced in fanout_class.mappers:
+                raise ImproperlyConfigured(
+                    "'{0}' in `mappers` refers to '{1}' which is imported in "
+                    "the same pass (source: {2})".format(
+                        mapper_class.__name__,
+                        referenced.__name__,
+                        fanout_class.__name__,
+                    )
+                )
@@ -0,0 +1,121 @@
+import os
+import re
+
+import pandas as pd
+from pandas.core.frame import DataFrame
+from pandas.core.series import Series
+
+from .services import BACKUP_DIR
+
+
+class RejectedRows:
+    """
+    Rows of a single chunk which are rejected while it is mapped. They are
+    added to the reject report once the chunk is committed, so that rows
+    of a chunk which is loaded again (e.g. by a resumed import) are not
+    reported twice.
+    """
+
+    def __init__(self) -> None:
+        self.counts = {}
+        self.frames = []
+
+    def add(self, field: str, reasons: Series) -> None:
+        """
+        Counts rejected values of a field by reason.
+        """
+        for reason, count in reasons.value_counts().items():
+            key = (field, reason)
+            self.counts[key] = self.counts.get(key, 0) + int(count)
+
+    def add_rows(self, rows: DataFrame, reasons: Series, mapper: str) -> None:
+        """
+        Keeps rejected source rows along with the reason and the mapper
+        which rejected them (mappers of a fan-out share the report).
+        """
+        if not rows.empty:
+            self.frames.append(rows.assign(reject_reason=reasons, reject_mapper=mapper))
+
+    def __len__(self) -> int:
+        return sum(len(frame) for frame in self.frames)
+
+
+class RejectReport:
+    """
+    Collects source rows which are not imported because one of their
+    reference fields could not be resolved. Counts are kept per field and
+    reason (`null` or `missing`), rejected rows are written to
+    `backups/<table>.rejects.csv` along with the reason and the mapper.
+    """
+
+    def __init__(self, sourcetable: str, partition=None) -> None:
+        self.sourcetable = sourcetable
+        self.partition = partition
+        self.counts = {}
+        self.total = 0
+
+    def get_file_path(self) -> str:
+        filename = self.sourcetable
+        if self.partition:
+            filename += f".{self.partition.name}"
+        return os.path.join(BACKUP_DIR, f"{filename}.rejects.csv")
+
+    @classmethod
+    def remove_stale(cls, sourcetable: str, partitions: list) -> None:
+        """
+        Removes reports of the table which are not written by any of the
+        given partitions (`None` stands for the whole table), e.g. reports
+        of a previous run with a different number of partitions.
+        """
+        if not os.path.isdir(BACKUP_DIR):
+            return
+        current = {
+            cls(sourcetable, partition).get_file_path() for partition in partitions
+        }
+        pattern = re.compile(
+            re.escape(sourcetable) + r"(\.part\d+of\d+)?\.rejects\.csv"
+        )
+        for filename in os.listdir(BACKUP_DIR):
+            path = os.path.join(BACKUP_DIR, filename)
+            if pattern.fullmatch(filename) and path not in current:
+                os.remove(path)
+
+    def reset(self) -> None:
+        """
+        Clears counts and removes rejected rows of the previous run.
+        """
+        self.counts = {}
+        self.total = 0
+        if self.partition is None:
+            # Reports of the partitions of a previous run are stale too.
+            self.remove_stale(self.sourcetable, [])
+        elif os.path.exists(self.get_file_path()):
+            os.remove(self.get_file_path())
+
+    def write(self, rejected: RejectedRows) -> None:
+        """
+        Adds rejected rows of a chunk to the counts and appends them to the
+        report file.
+        """
+        for key, count in rejected.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        if not rejected.frames:
+            return
+        rows = pd.concat(rejected.frames)
+        self.total += len(rows)
+        # File is removed by `reset`, rows of a resumed import are appended.
+        has_file = os.path.exists(self.get_file_path())
+        rows.to_csv(
+            self.get_file_path(),
+            mode="a" if has_file else "w",
+            header=not has_file,
+            index=False,
+        )
+
+    def summary(self) -> dict:
+        """
+        Returns number of rejected values as `{"<field>:<reason>": count}`.
+        """
+        return {
+            f"{field}:{reason}": count for (field, reason), count in self.counts.items()
+        }
@@ -0,0 +1,200 @@
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from graphlib import TopologicalSorter
+
+import django
+from django.db import connections
+
+from .base import IMPORTED_TABLES, clear_key_indexes
+from .conf import get_setting
+from .journal import CheckpointJournal
+from .metrics import RUN_REPORT
+from .partitions import get_partitions, load_partitions, save_partitions
+from .rejects import RejectReport
+
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+def init_worker() -> None:
+    """
+    Sets up django in worker processes which are not forked.
+    """
+    django.setup()
+
+
+def run_mapper(mapper_class, imported_tables, options, partition=None) -> dict:
+    """
+    Imports data of a single mapper (or of one partition of its source
+    table) inside a worker. Worker uses its own database connections which
+    are closed once the import is done.
+    """
+    # Worker processes do not share state with the scheduler.
+    IMPORTED_TABLES.update(imported_tables)
+    start = time.perf_counter()
+    try:
+        mapper = mapper_class()
+        mapper.importdata(partition=partition, **options)
+    finally:
+        connections.close_all()
+    return {
+        "sourcetable": mapper_class.sourcetable,
+        "partition": partition.name if partition else None,
+        "rows": mapper.imported_rows,
+        "seconds": time.perf_counter() - start,
+        "metrics": mapper.metrics.as_dict(),
+    }
+
+
+class Scheduler:
+    """
+    Imports mappers in the order of their dependencies.
+
+    Dependency graph is built from `ReferenceField` declarations of the
+    mappers (related mappers which are not in the list are added as
+    well). A mapper is submitted to the pool of workers as soon as all of
+    the mappers it depends on are imported, so mappers which do not depend
+    on each other run concurrently. Mappers which define `partitions` are
+    split into one job per partition of their source table.
+    """
+
+    def __init__(self, mappers_list, workers=None, executor=None) -> None:
+        self.mappers_list = mappers_list
+        self.workers = workers or get_setting("WORKERS")
+        self.executor = executor or get_setting("EXECUTOR")
+        # Throughput of every finished job.
+        self.results = []
+
+        if self.executor not in EXECUTORS:
+            raise ValueError(
+                "Unknown executor '{0}' (available: {1})".format(
+                    self.executor, ", ".join(EXECUTORS)
+                )
+            )
+
+    def get_graph(self) -> dict:
+        """
+        Returns mappers along with the mappers they depend on.
+        """
+        graph = {}
+        # Mappers of a fan-out are replaced by the fan-out.
+        pending = [mapper_class.get_importer() for mapper_class in self.mappers_list]
+        while pending:
+            mapper_class = pending.pop()
+            if mapper_class in graph:
+                continue
+            graph[mapper_class] = set(mapper_class.get_dependencies())
+            pending.extend(graph[mapper_class])
+        return graph
+
+    def get_pool(self):
+        if self.executor == "process":
+            # Forked workers should not share connections of the scheduler.
+            connections.close_all()
+            return ProcessPoolExecutor(self.workers, initializer=init_worker)
+        return ThreadPoolExecutor(self.workers)
+
+    def is_resumed(self, mapper_class, partitions) -> bool:
+        """
+        Tells whether any of the partitions has a checkpoint of a previous
+        run of the mapper.
+        """
+        if not get_setting("CHECKPOINTS"):
+            return False
+        journal = CheckpointJournal()
+        name = mapper_class.get_mapper_name()
+        return any(journal.get(name, partition.name) for partition in partitions)
+
+    def get_partitions(self, mapper_class) -> list:
+        """
+        Returns partitions of the mapper, `[None]` if it is not partitioned.
+
+        Range boundaries depend on the rows of the source table, so with
+        checkpoints the partitions are stored when the import starts and a
+        resumed import reuses them. Rows added or removed meanwhile do not
+        move keys between partitions which are already (partly) imported.
+        """
+        partitions = get_partitions(mapper_class)
+        if not partitions:
+            return [None]
+        if not get_setting("CHECKPOINTS"):
+            return partitions
+        stored = load_partitions(mapper_class)
+        if stored is not None and self.is_resumed(mapper_class, stored):
+            return stored
+        save_partitions(mapper_class, partitions)
+        return partitions
+
+    def submit(self, pool, mapper_class, options) -> list:
+        """
+        Submits jobs of the mapper to the pool, returns their futures.
+        """
+        print(f"Importing data from {mapper_class.sourcetable}...")
+        imported_tables = set(IMPORTED_TABLES)
+        partitions = self.get_partitions(mapper_class)
+        if partitions != [None]:
+            RejectReport.remove_stale(mapper_class.sourcetable, partitions)
+        if partitions != [None] and not self.is_resumed(mapper_class, partitions):
+            # Partitions add keys to the same key map, it is reset once
+            # before they start. Keys of the resumed partitions are kept.
+            mapper_class().reset_key_maps()
+        return [
+            pool.submit(run_mapper, mapper_class, imported_tables, options, partition)
+            for partition in partitions
+        ]
+
+    def report(self, result: dict) -> None:
+        self.results.append(result)
+        if self.executor == "process":
+            # Metrics are added to the run report of the worker process.
+            RUN_REPORT.add(result["metrics"])
+        rows_per_sec = result["rows"] / result["seconds"] if result["seconds"] else 0
+        name = result["sourcetable"]
+        if result["partition"]:
+            name += f" ({result['partition']})"
+        print(
+            f"Imported {result['rows']} rows from {name} "
+            f"in {result['seconds']:.2f}s ({rows_per_sec:.0f} rows/sec)"
+        )
+
+    def run(self, **options) -> None:
+        sorter = TopologicalSorter(self.get_graph())
+        sorter.prepare()
+
+        with self.get_pool() as pool:
+            running = {}
+            remaining = {}
+            while sorter.is_active():
+                for mapper_class in sorter.get_ready():
+                    if mapper_class.sourcetable in IMPORTED_TABLES:
+                        sorter.done(mapper_class)
+                        continue
+                    futures = self.submit(pool, mapper_class, options)
+                    running.update({future: mapper_class for future in futures})
+                    remaining[mapper_class] = len(futures)
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    mapper_class = running.pop(future)
+                    try:
+                        self.report(future.result())
+                    except Exception:
+                        for pending in running:
+                            pending.cancel()
+                        raise
+
+                    remaining[mapper_class] -= 1
+                    if remaining[mapper_class] == 0:
+                        IMPORTED_TABLES.add(mapper_class.sourcetable)
+                        clear_key_indexes(mapper_class)
+                        sorter.done(mapper_class)
@@ -1,22 +1,243 @@
-from .base import DATASET
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 
-def import_data(mappers_list):
+from django.core.management.color import no_style
+from django.db import connections
+
+from .base import DATASET, IMPORTED_TABLES
+from .cache import clear_snapshots
+from .conf import get_setting
+from .fastload import FastLoad, fast_load
+from .journal import CheckpointJournal
+from .metrics import RUN_REPORT, logger
+from .scheduler import Scheduler
+from .services import BACKUP_DIR
+from .verify import verify_mapper
+
+
+def write_run_report():
+    """
+    Writes metrics of the mappers imported in the current run to
+    `run_report.json` in the backups directory.
+    """
+    if not get_setting("RUN_REPORT"):
+        return
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    path = os.path.join(BACKUP_DIR, "run_report.json")
+    RUN_REPORT.write(path)
+    print(f"Run report: {path}")
+
+
+def get_importers(mappers_list) -> list:
+    """
+    Returns mappers which import the given ones, mappers of a fan-out are
+    replaced by the fan-out.
+    """
+    return list(dict.fromkeys(Mapper.get_importer() for Mapper in mappers_list))
+
+
+def get_destination_models(mappers_list) -> list:
+    """
+    Returns destination models of the mappers and of the mappers they
+    depend on.
+    """
+    graph = Scheduler(mappers_list).get_graph()
+    return [mapper.destmodel for node in graph for mapper in node.get_mappers()]
+
+
+def reset_sequences(mappers_list, using="default"):
+    """
+    Resets sequences of the destination tables of mappers which preserve
+    source primary keys (and of the mappers they depend on), so that rows
+    created afterwards do not get keys of imported rows.
+    """
+    graph = Scheduler(mappers_list).get_graph()
+    models = list(
+        dict.fromkeys(
+            mapper.destmodel
+            for node in graph
+            for mapper in node.get_mappers()
+            if mapper.preserve_pk
+        )
+    )
+    connection = connections[using]
+    sql_list = connection.ops.sequence_reset_sql(no_style(), models)
+    if not sql_list:
+        return
+
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        for sql in sql_list:
+            cursor.execute(sql)
+    logger.info(
+        "Reset sequences of %d tables in %.2fs",
+        len(models),
+        time.perf_counter() - start,
+    )
+
+
+def finish_import(mappers_list):
+    """
+    Runs steps which follow every import: resets sequences and writes the
+    run report.
+    """
+    if get_setting("RESET_SEQUENCES"):
+        reset_sequences(mappers_list)
+    write_run_report()
+
+
+def get_load_context(mappers_list):
+    """
+    Returns context which the import runs in, destination indexes are
+    dropped for the duration of the import with `FAST_LOAD` setting.
+    """
+    if get_setting("FAST_LOAD"):
+        return fast_load(get_destination_models(mappers_list))
+    return nullcontext()
+
+
+def import_data(mappers_list, chunk_size=None, loader=None, source_mode=None):
+    print("Import process started...")
+    RUN_REPORT.reset()
+
+    with get_load_context(mappers_list):
+        for Mapper in get_importers(mappers_list):
+            mapper = Mapper()
+            print("-----------------------------------------")
+            print(f"Importing data from {mapper.sourcetable}...")
+            if mapper.sourcetable not in IMPORTED_TABLES:
+                mapper.importdata(
+                    chunk_size=chunk_size,
+                    loader=loader,
+                    source_mode=source_mode,
+                )
+
+    print("-----------------------------------------")
+    print("-----------------------------------------")
+    print("Import process completed.")
+    finish_import(mappers_list)
+
+
+def import_data_parallel(mappers_list, workers=None, executor=None, **options):
+    """
+    Imports data of the mappers in dependency order, mappers which do not
+    depend on each other are imported concurrently. See `Scheduler`.
+    """
     print("Import process started...")
+    RUN_REPORT.reset()
+
+    scheduler = Scheduler(mappers_list, workers=workers, executor=executor)
+    with get_load_context(mappers_list):
+        scheduler.run(**options)
 
-    for Mapper in mappers_list:
+    print("-----------------------------------------")
+    print("Import process completed.")
+    finish_import(mappers_list)
+
+
+def sync_data(mappers_list, chunk_size=None, loader=None, source_mode=None):
+    """
+    Imports rows which are added or changed since the previous sync of
+    the mappers and updates existing rows. Mappers should define
+    `watermark_column`.
+    """
+    print("Sync process started...")
+    RUN_REPORT.reset()
+
+    # Tables imported earlier in this process are synced again.
+    IMPORTED_TABLES.clear()
+    DATASET.clear()
+    for Mapper in get_importers(mappers_list):
         mapper = Mapper()
         print("-----------------------------------------")
-        print(f"Importing data from {mapper.sourcetable}...")
-        if DATASET.get(mapper.sourcetable, {}) == {}:
-            mapper.importdata()
+        print(f"Syncing data from {mapper.sourcetable}...")
+        if mapper.sourcetable not in IMPORTED_TABLES:
+            mapper.syncdata(
+                chunk_size=chunk_size,
+                loader=loader,
+                source_mode=source_mode,
+            )
 
-        objects = mapper.destmodel.objects.all()
+    print("-----------------------------------------")
+    print("Sync process completed.")
+    finish_import(mappers_list)
 
-        dictionary = {}
-        for obj in objects:
-            dictionary[obj.pk] = obj
-        DATASET[mapper.sourcetable] = dictionary
 
+def restore_indexes(mappers_list):
+    """
+    Rebuilds indexes and foreign keys of destination tables which are
+    missing, e.g. after an import with `FAST_LOAD` setting was killed.
+    """
+    FastLoad(get_destination_models(mappers_list)).restore()
+
+
+def verify_data(mappers_list, workers=None, chunk_size=None) -> list:
+    """
+    Compares destination tables of the mappers (and of the mappers they
+    depend on) with their source tables, see `Verifier`. Tables are
+    verified concurrently by `workers` threads. Results are written to
+    `verify_report.json` in the backups directory and returned.
+    """
+    print("Verification started...")
+    graph = Scheduler(mappers_list).get_graph()
+    mappers = [mapper for node in graph for mapper in node.get_mappers()]
+    workers = workers or get_setting("WORKERS")
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(partial(verify_mapper, chunk_size=chunk_size), mappers))
+
+    for result in results:
+        status = "OK" if result["ok"] else "MISMATCH"
+        print(
+            f"{result['sourcetable']} -> {result['desttable']}: {status} "
+            f"({result['source_rows']} source rows, {result['rejected_rows']} "
+            f"rejected, {result['dest_rows']} destination rows)"
+        )
+        if result["mismatched_chunks"]:
+            print(
+                f"  {result['mismatched_chunks']} of {result['chunks']} chunks "
+                f"differ: {result['missing']['count']} missing, "
+                f"{result['unexpected']['count']} unexpected, "
+                f"{result['changed']['count']} changed rows"
+            )
+        if result["checksums"] != "compared":
+            print(f"  Checksums {result['checksums']}")
+
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    path = os.path.join(BACKUP_DIR, "verify_report.json")
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, default=str)
     print("-----------------------------------------")
-    print("-----------------------------------------")
-    print("Import process completed.")
\ No newline at end of file
+    print(
+        "Verification completed: {0} of {1} tables match ({2}).".format(
+            sum(result["ok"] for result in results), len(results), path
+        )
+    )
+    return results
+
+
+def clear_snapshot_cache(mappers_list=None):
+    """
+    Removes cached snapshots of the source tables of the given mappers (or
+    of all mappers), so that the next import exports them again.
+    """
+    tables = None
+    if mappers_list is not None:
+        tables = {Mapper.sourcetable for Mapper in mappers_list}
+    clear_snapshots(BACKUP_DIR, tables)
+
+
+def reset_checkpoints(mappers_list=None):
+    """
+    Removes checkpoints of the given mappers (or of all mappers), so that
+    the next import starts from scratch.
+    """
+    journal = CheckpointJournal()
+    if mappers_list is None:
+        journal.reset()
+        return
+    for Mapper in get_importers(mappers_list):
+        journal.reset(Mapper.get_mapper_name())
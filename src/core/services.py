@@ -1,46 +1,207 @@
-import csv
+import itertools
 import os
 
 from django.conf import settings
 from django.db import connections
 
+from .cache import SnapshotCache, evict_snapshots
+from .conf import get_setting
+from .metrics import MapperMetrics
+from .snapshots import get_snapshot_class
+
 DATASET = {}
 
 BACKUP_DIR = os.path.join(settings.BASE_DIR, "backups")
 
 
+def get_snapshot_path(tablename, snapshot_format=None, partition=None, datadir=""):
+    """
+    Returns path of the snapshot file of a table (or of its partition).
+    """
+    extension = get_snapshot_class(
+        snapshot_format or get_setting("SNAPSHOT_FORMAT")
+    ).extension
+    filename = tablename
+    if partition:
+        filename += f".{partition.name}"
+    return os.path.join(datadir or BACKUP_DIR, f"{filename}.{extension}")
+
+
 class DatabaseExportService:
-    def __init__(self, tablename):
+    """
+    Exports a table from the source database.
+
+    Rows are streamed from the source database in chunks of `chunk_size`,
+    so memory usage is bounded by one chunk instead of the size of the
+    table. On PostgreSQL a named (server-side) cursor is used, other
+    backends fall back to a regular cursor with `fetchmany`. Chunks can be
+    written to a snapshot file (`export`) or consumed directly by the
+    importer (`iter_chunks`). With `SNAPSHOT_CACHE` setting, `export`
+    reuses the snapshot file while it is still valid (see `SnapshotCache`).
+    """
+
+    def __init__(
+        self,
+        tablename,
+        chunk_size=None,
+        snapshot_format=None,
+        partition=None,
+        filters=None,
+        order_by=None,
+        metrics=None,
+        select_columns=None,
+        source_pk=None,
+    ):
         self.tablename = tablename
+        self.chunk_size = chunk_size or get_setting("EXPORT_CHUNK_SIZE")
+        self.snapshot_format = snapshot_format or get_setting("SNAPSHOT_FORMAT")
+        # Only rows of the given partition are exported if it is set.
+        self.partition = partition
+        # Additional conditions as a list of `(sql, params)` tuples.
+        self.filters = filters or []
+        # Column (or list of columns) which rows are ordered by, prefix a
+        # column with `-` for descending order.
+        self.order_by = order_by
+        # Columns which are exported, all columns if not set.
+        self.select_columns = select_columns
+        # Primary key column, its largest value is part of the fingerprint
+        # of cached snapshots.
+        self.source_pk = source_pk
+        # Time spent in `export` and `write` stages is added to it.
+        self.metrics = metrics or MapperMetrics(tablename, partition)
+        self.columns = None
 
-        if not os.path.exists(BACKUP_DIR):
-            os.makedirs(BACKUP_DIR)
+        # Services of parallel imports may create it at the same time.
+        os.makedirs(BACKUP_DIR, exist_ok=True)
 
     def get_columns(self, cursor):
-        columns = [desc.name for desc in cursor.description]
+        columns = [desc[0] for desc in cursor.description]
         return columns
 
+    def get_file_path(self):
+        return get_snapshot_path(self.tablename, self.snapshot_format, self.partition)
+
+    def get_snapshot(self):
+        return get_snapshot_class(self.snapshot_format)(self.get_file_path())
+
+    def get_where(self):
+        """
+        Returns WHERE clause (empty if there are no conditions) and its
+        parameters which select rows to export.
+        """
+        filters = list(self.filters)
+        if self.partition and self.partition.where:
+            filters.append((self.partition.where, self.partition.params))
+        if not filters:
+            return "", []
+
+        where = " WHERE " + " AND ".join(f"({sql})" for sql, _ in filters)
+        params = []
+        for _, filter_params in filters:
+            params.extend(filter_params)
+        return where, params
+
+    def get_query(self, connection):
+        """
+        Returns SQL query and its parameters which select rows to export.
+        """
+        quote_name = connection.ops.quote_name
+        columns = "*"
+        if self.select_columns:
+            columns = ", ".join(quote_name(column) for column in self.select_columns)
+
+        where, params = self.get_where()
+        query = "SELECT {0} FROM {1}{2}".format(columns, self.tablename, where)
+        if self.order_by:
+            order_by = self.order_by
+            if isinstance(order_by, str):
+                order_by = [order_by]
+            query += " ORDER BY " + ", ".join(
+                (
+                    f"{quote_name(column[1:])} DESC"
+                    if column.startswith("-")
+                    else quote_name(column)
+                )
+                for column in order_by
+            )
+        return query, params
+
     def fetch_data(self, cursor):
-        cursor.execute("SELECT * FROM {0}".format(self.tablename))
-        table_data = cursor.fetchall()
-        return table_data
-
-    def save_to_csv(self, data, columns):
-        filename = f"{self.tablename}.csv"
-        filepath = os.path.join(BACKUP_DIR, filename)
-        with open(filepath, "w", newline="") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(columns)  # Write column names
-            writer.writerows(data)
+        """
+        Yields rows of the table in chunks of `chunk_size`.
+        """
+        cursor.execute(*self.get_query(cursor.db))
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            yield rows
 
-    def export(self):
-        conn = connections["source"]
-        cursor = conn.cursor()
+    def iter_chunks(self, save_snapshot=False):
+        """
+        Yields chunks of rows from the source table. `columns` attribute is
+        populated before the first chunk is yielded. If `save_snapshot` is
+        set, rows are also written to the snapshot file as they pass.
+        """
+        # Dedicated connection, so that nested exports (e.g. parent tables
+        # imported while a child table is being read) do not close it.
+        conn = connections.create_connection("source")
+        # Server-side cursor on PostgreSQL, regular cursor on other backends.
+        cursor = conn.chunked_cursor()
+        snapshot = self.get_snapshot() if save_snapshot else None
+        if snapshot:
+            # Snapshot file is rewritten, so it is no longer valid.
+            SnapshotCache(self).invalidate()
 
-        data = self.fetch_data(cursor)
-        columns = self.get_columns(cursor)
+        try:
+            data = self.metrics.measure_iter("export", self.fetch_data(cursor), conn)
+            # Named cursors describe their columns only after the first fetch.
+            first_chunk = next(data, [])
+            self.columns = self.get_columns(cursor)
+
+            if snapshot:
+                snapshot.open(self.columns)
+
+            for rows in itertools.chain([first_chunk], data):
+                if not rows:
+                    continue
+                if snapshot:
+                    with self.metrics.measure("write") as stage:
+                        snapshot.write(rows)
+                        stage.rows += len(rows)
+                yield rows
+        finally:
+            if snapshot:
+                with self.metrics.measure("write") as stage:
+                    snapshot.close()
+                    if os.path.exists(self.get_file_path()):
+                        stage.bytes_written += os.path.getsize(self.get_file_path())
+            cursor.close()
+            conn.close()
+
+    def export(self):
+        """
+        Writes the whole table to the snapshot file.
+        """
+        if not get_setting("SNAPSHOT_CACHE"):
+            for _ in self.iter_chunks(save_snapshot=True):
+                pass
+            return
 
-        self.save_to_csv(data, columns)
+        cache = SnapshotCache(self)
+        # Taken before the export, rows changed meanwhile invalidate it.
+        with self.metrics.measure("export"):
+            fingerprint = cache.get_fingerprint()
+        if cache.is_valid(fingerprint):
+            cache.touch()
+            print(f"Reusing snapshot of {self.tablename} ({self.get_file_path()})")
+            return
 
-        cursor.close()
-        conn.close()
+        for _ in self.iter_chunks(save_snapshot=True):
+            pass
+        cache.save(fingerprint)
+        evict_snapshots(
+            BACKUP_DIR,
+            get_setting("SNAPSHOT_CACHE_SIZE") * 2**20,
+            keep=[self.get_file_path()],
+        )
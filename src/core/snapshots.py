@@ -0,0 +1,373 @@
+import csv
+import os
+import threading
+
+import pandas as pd
+from django.core.exceptions import ImproperlyConfigured
+
+from .metrics import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pc = None
+    pacsv = None
+    pq = None
+
+# Pandas type of text columns, arrow strings take less memory than python
+# strings.
+STRING_DTYPE = pd.StringDtype("pyarrow" if pa is not None else "python")
+
+
+def get_pandas_type(datatype):
+    """
+    Maps arrow types to nullable pandas types, so that integer columns
+    with NULL values are not converted to floats.
+    """
+    if pa.types.is_integer(datatype):
+        return pd.Int64Dtype()
+    if pa.types.is_boolean(datatype):
+        return pd.BooleanDtype()
+    if pa.types.is_string(datatype):
+        return STRING_DTYPE
+    return None
+
+
+def get_arrow_type(dtype):
+    """
+    Maps pandas types of a dtype plan to arrow types, types which are not
+    mapped are inferred by arrow.
+    """
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if isinstance(dtype, pd.Int64Dtype):
+        return pa.int64()
+    if isinstance(dtype, pd.BooleanDtype):
+        return pa.bool_()
+    if isinstance(dtype, pd.Float64Dtype):
+        return pa.float64()
+    if isinstance(dtype, pd.StringDtype):
+        return pa.string()
+    return None
+
+
+def widen_type(old, new):
+    """
+    Returns arrow type which can hold values of both types. Decimals keep
+    the largest number of integer digits and decimal places, types which
+    cannot be merged are stored as strings.
+    """
+    if old == new:
+        return old
+    if pa.types.is_decimal(old) and pa.types.is_decimal(new):
+        scale = max(old.scale, new.scale)
+        precision = max(old.precision - old.scale, new.precision - new.scale) + scale
+        if precision <= 38:
+            return pa.decimal128(precision, scale)
+        return pa.decimal256(min(precision, 76), scale)
+    try:
+        schema = pa.unify_schemas(
+            [pa.schema([("value", old)]), pa.schema([("value", new)])],
+            promote_options="permissive",
+        )
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.string()
+    return schema.field("value").type
+
+
+def iter_tables(batches, chunk_size: int):
+    """
+    Yields arrow tables with `chunk_size` rows (the last one may have
+    less) built from record batches of any size.
+    """
+    pending = []
+    rows = 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunk_size:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunk_size)
+            rest = table.slice(chunk_size)
+            pending = rest.to_batches()
+            rows = rest.num_rows
+    if rows:
+        yield pa.Table.from_batches(pending)
+
+
+class CsvSnapshot:
+    """
+    Stores source table as a CSV file. Column types are read with the
+    given dtype plan (see `BaseModelMap.get_source_dtypes`), types of the
+    other columns are inferred while reading it back.
+
+    File is read by pandas (`c` engine) or by arrow (`pyarrow` engine, it
+    parses the file in multiple threads and keeps strings in arrow
+    buffers).
+    """
+
+    extension = "csv"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = None
+        self.writer = None
+
+    def open(self, columns: list) -> None:
+        self.file = open(self.path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)  # Write column names
+
+    def write(self, rows: list) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def get_header(self) -> list:
+        """
+        Returns column names from the first line of the file.
+        """
+        with open(self.path, newline="") as f:
+            return next(csv.reader(f), [])
+
+    def read_chunks(self, chunk_size: int, columns=None, dtypes=None, engine="c"):
+        """
+        Yields DataFrames with at most `chunk_size` rows. Only `columns`
+        are read if they are given, `dtypes` maps columns to pandas types
+        (`datetime` for timestamps). Types of columns which are not read
+        are ignored.
+        """
+        header = self.get_header()
+        if columns is not None:
+            header = [column for column in header if column in columns]
+        dtypes = {
+            column: dtype
+            for column, dtype in (dtypes or {}).items()
+            if column in header
+        }
+        if engine == "pyarrow":
+            yield from self.read_arrow_chunks(chunk_size, columns, dtypes)
+            return
+        if engine != "c":
+            raise ValueError("Unknown CSV engine '{0}'".format(engine))
+
+        options = {"dtype": {}, "parse_dates": []}
+        # Nullable numeric types are much slower to parse with `c` engine,
+        # such columns are parsed as inferred and converted afterwards.
+        casts = {}
+        for column, dtype in dtypes.items():
+            if dtype == "datetime":
+                options["parse_dates"].append(column)
+            elif dtype == "string":
+                options["dtype"][column] = STRING_DTYPE
+            else:
+                casts[column] = dtype
+        if columns is not None:
+            # Columns which are not in the file are ignored.
+            needed = set(columns)
+            options["usecols"] = lambda column: column in needed
+        with pd.read_csv(self.path, chunksize=chunk_size, **options) as reader:
+            for df in reader:
+                for column, dtype in casts.items():
+                    try:
+                        df[column] = df[column].astype(dtype)
+                    except (TypeError, ValueError) as error:
+                        self.log_cast_error(column, dtype, error)
+                yield df
+
+    def log_cast_error(self, column: str, dtype, error: Exception) -> None:
+        # Values which do not fit are left to the mapper, rows with such
+        # values are rejected or fail in the destination database.
+        logger.warning(
+            "Column %s of %s is read with inferred type, values do not fit %s: %s",
+            column,
+            self.path,
+            dtype,
+            error,
+        )
+
+    def read_arrow_chunks(self, chunk_size: int, columns=None, dtypes=None):
+        if pa is None:
+            raise ImproperlyConfigured("`pyarrow` is required to use pyarrow engine")
+
+        column_types = {}
+        casts = {}
+        for column, dtype in (dtypes or {}).items():
+            # Timestamps are recognized by arrow.
+            datatype = None if dtype == "datetime" else get_arrow_type(dtype)
+            if datatype is None:
+                continue
+            # Other columns are read as strings and converted afterwards,
+            # so that a value which does not fit only affects its chunk.
+            column_types[column] = pa.string()
+            if not pa.types.is_string(datatype):
+                casts[column] = datatype
+        convert_options = pacsv.ConvertOptions(
+            column_types=column_types,
+            include_columns=columns,
+            include_missing_columns=columns is not None,
+            strings_can_be_null=True,
+        )
+        with pacsv.open_csv(self.path, convert_options=convert_options) as reader:
+            for table in iter_tables(reader, chunk_size):
+                for column, datatype in casts.items():
+                    index = table.schema.get_field_index(column)
+                    try:
+                        values = pc.cast(table.column(index), datatype)
+                    except pa.ArrowInvalid as error:
+                        self.log_cast_error(column, datatype, error)
+                        continue
+                    table = table.set_column(index, column, values)
+                yield table.to_pandas(types_mapper=get_pandas_type)
+
+
+class ParquetSnapshot:
+    """
+    Stores source table as a Parquet file, each chunk of rows fetched from
+    the source database is written as a row group. Column types of the
+    source table are kept (nullable integers, booleans, timestamps) and
+    the file is memory-mapped while reading it back.
+
+    Column types are inferred from the rows. If a later chunk does not fit
+    the types of the previous ones (e.g. a column which only had NULL
+    values, or decimals with more digits), the types are widened and the
+    row groups written so far are rewritten. Columns without any values
+    are stored as strings.
+    """
+
+    extension = "parquet"
+
+    def __init__(self, path: str) -> None:
+        if pa is None:
+            raise ImproperlyConfigured("`pyarrow` is required to use parquet snapshots")
+        self.path = path
+        self.columns = None
+        self.schema = None
+        self.writer = None
+        # Columns which only had NULL values so far.
+        self.null_columns = set()
+
+    def open(self, columns: list) -> None:
+        self.columns = columns
+
+    def get_type(self, values: list):
+        """
+        Returns arrow type of the values, `None` if they are all NULL.
+        """
+        datatype = pa.array(values).type
+        if pa.types.is_null(datatype):
+            return None
+        if pa.types.is_decimal(datatype):
+            # Precision of decimals varies from chunk to chunk, they start
+            # with 20 integer digits and 18 decimal places.
+            return widen_type(pa.decimal128(38, 18), datatype)
+        return datatype
+
+    def get_schema(self, rows: list):
+        """
+        Returns schema which fits the rows and the rows written so far.
+        """
+        values = list(zip(*rows)) if rows else [[] for _ in self.columns]
+        fields = []
+        for index, (column, column_values) in enumerate(zip(self.columns, values)):
+            datatype = self.get_type(list(column_values))
+            if self.schema is None:
+                if datatype is None:
+                    self.null_columns.add(column)
+                fields.append((column, datatype or pa.string()))
+            elif datatype is None:
+                fields.append(self.schema.field(index))
+            elif column in self.null_columns:
+                self.null_columns.discard(column)
+                fields.append((column, datatype))
+            else:
+                fields.append(
+                    (column, widen_type(self.schema.field(index).type, datatype))
+                )
+        return pa.schema(fields)
+
+    def to_table(self, rows: list):
+        values = list(zip(*rows)) if rows else [[] for _ in self.columns]
+        arrays = []
+        for field, column_values in zip(self.schema, values):
+            if pa.types.is_string(field.type):
+                column_values = [
+                    value if value is None else str(value) for value in column_values
+                ]
+            arrays.append(pa.array(column_values, type=field.type))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def rewrite(self, schema) -> None:
+        """
+        Rewrites row groups written so far with the widened schema.
+        """
+        self.writer.close()
+        temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.replace(self.path, temp_path)
+        try:
+            self.writer = pq.ParquetWriter(self.path, schema)
+            parquet_file = pq.ParquetFile(temp_path)
+            for index in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(index)
+                self.writer.write_table(table.cast(schema))
+        finally:
+            os.remove(temp_path)
+        self.schema = schema
+
+    def write(self, rows: list) -> None:
+        schema = self.get_schema(rows)
+        if self.writer is None:
+            self.schema = schema
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        elif schema != self.schema:
+            self.rewrite(schema)
+        self.writer.write_table(self.to_table(rows))
+
+    def close(self) -> None:
+        if self.writer is None and self.columns is not None:
+            # Table is empty, write the file with column names only.
+            self.write([])
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def read_chunks(self, chunk_size: int, columns=None, dtypes=None, engine=None):
+        """
+        Yields DataFrames with at most `chunk_size` rows. Only `columns`
+        are read if they are given, types are stored in the file, so
+        `dtypes` and `engine` are ignored.
+        """
+        parquet_file = pq.ParquetFile(self.path, memory_map=True)
+        if parquet_file.metadata.num_rows == 0:
+            return
+        if columns is not None:
+            columns = [
+                name for name in parquet_file.schema_arrow.names if name in columns
+            ]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas(types_mapper=get_pandas_type)
+
+
+SNAPSHOT_FORMATS = {
+    "csv": CsvSnapshot,
+    "parquet": ParquetSnapshot,
+}
+
+
+def get_snapshot_class(name: str):
+    """
+    Returns snapshot class registered with the given format name.
+    """
+    if name not in SNAPSHOT_FORMATS:
+        raise ValueError(
+            "Unknown snapshot format '{0}' (available: {1})".format(
+                name, ", ".join(SNAPSHOT_FORMATS)
+            )
+        )
+    return SNAPSHOT_FORMATS[name]
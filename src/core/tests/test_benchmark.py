@@ -0,0 +1,68 @@
+import json
+import os
+
+from django.db import connections
+from django.test import override_settings
+
+from core.benchmark import compare_benchmarks, run_benchmark
+from core.journal import CheckpointJournal
+from core.mappers import mappers_list
+from core.services import BACKUP_DIR
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+class BenchmarkTests(MigratorTestCase):
+    def test_synthetic_tables_are_imported(self):
+        output = os.path.join(BACKUP_DIR, "benchmark-test.json")
+        report = run_benchmark([50, 120], mappers_list, output=output, replace=True)
+
+        with open(output) as f:
+            self.assertEqual(json.load(f), json.loads(json.dumps(report)))
+        self.assertEqual([result["size"] for result in report["results"]], [50, 120])
+        result = report["results"][1]
+        self.assertEqual(result["tables"]["developer"], 120)
+        self.assertEqual(result["rows"], 120 + 100 + 1 + 120)
+        self.assertEqual(len(result["mappers"]), len(mappers_list))
+        self.assertEqual(models.Developer.objects.count(), 120)
+        # Source tables are removed once the benchmark is done.
+        self.assertNotIn("developer", connections["source"].introspection.table_names())
+
+    def test_destination_rows_are_only_removed_with_flush(self):
+        models.Technology.objects.create(title="kept")
+        with self.assertRaisesMessage(ValueError, "'technology' is not empty"):
+            run_benchmark([10], mappers_list, replace=True)
+        self.assertEqual(models.Technology.objects.get().title, "kept")
+        self.assertIn("developer", connections["source"].introspection.table_names())
+
+        journal = CheckpointJournal()
+        checkpoint = {"status": "completed", "chunks": 1, "rows": 1}
+        journal.save("other.Mapper", "", checkpoint)
+        journal.save(mappers_list[0].get_mapper_name(), "", checkpoint)
+        output = os.path.join(BACKUP_DIR, "benchmark-test.json")
+        with override_settings(DB_MIGRATOR={"CHECKPOINTS": True}):
+            run_benchmark([10], mappers_list, output=output, replace=True, flush=True)
+
+        self.assertEqual(models.Technology.objects.count(), 10)
+        self.assertIsNotNone(journal.get("other.Mapper"))
+        self.assertEqual(journal.get(mappers_list[0].get_mapper_name())["rows"], 10)
+
+    def write_results(self, label: str, rows_per_sec: float) -> str:
+        mapper = {"sourcetable": "developer", "partition": None}
+        result = {
+            "size": 10,
+            "rows_per_sec": rows_per_sec,
+            "mappers": [dict(mapper, rows_per_sec=rows_per_sec / 2)],
+        }
+        path = os.path.join(BACKUP_DIR, f"benchmark-{label}.json")
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"label": label, "results": [result]}, f)
+        return path
+
+    def test_results_are_compared(self):
+        ratios = compare_benchmarks(
+            self.write_results("old", 100.0), self.write_results("new", 150.0)
+        )
+        self.assertEqual(ratios, {10: {"total": 1.5, "developer": 1.5}})
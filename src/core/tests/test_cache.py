@@ -0,0 +1,70 @@
+import json
+import os
+import time
+
+from django.test import override_settings
+
+from core.cache import META_SUFFIX, evict_snapshots, get_cached_snapshots
+from core.mappers import DeveloperMapper
+from core.scripts import clear_snapshot_cache
+from core.services import BACKUP_DIR, DatabaseExportService
+
+from .utils import MigratorTestCase
+
+
+@override_settings(DB_MIGRATOR={"SNAPSHOT_CACHE": True})
+class SnapshotCacheTests(MigratorTestCase):
+    def export(self, tablename="developer", **options) -> int:
+        """
+        Exports the table, returns modification time of the snapshot.
+        """
+        service = DatabaseExportService(tablename, source_pk="id", **options)
+        service.export()
+        return os.stat(service.get_file_path()).st_mtime_ns
+
+    def read_ids(self) -> list:
+        with open(os.path.join(BACKUP_DIR, "developer.csv")) as f:
+            return [line.split(",")[0] for line in f.read().splitlines()[1:]]
+
+    def test_snapshot_is_reused_while_source_is_unchanged(self):
+        written = self.export()
+        self.assertEqual(self.export(), written)
+
+        self.execute("INSERT INTO developer VALUES (21, 'first 21', 'last 21', 1, 1)")
+        self.assertNotEqual(self.export(), written)
+        self.assertEqual(len(self.read_ids()), 21)
+
+    def test_snapshot_of_other_export_is_not_reused(self):
+        written = self.export()
+
+        self.assertNotEqual(self.export(select_columns=["id"]), written)
+        self.assertEqual(self.read_ids(), [str(pk) for pk in range(1, 21)])
+
+    def test_snapshot_cache_is_cleared(self):
+        self.export()
+        self.export("team")
+
+        clear_snapshot_cache([DeveloperMapper])
+
+        tables = [meta["table"] for _, meta in get_cached_snapshots(BACKUP_DIR)]
+        self.assertEqual(tables, ["team"])
+        self.assertFalse(os.path.exists(os.path.join(BACKUP_DIR, "developer.csv")))
+
+    def test_least_recently_used_snapshots_are_evicted(self):
+        os.makedirs(BACKUP_DIR)
+        # Snapshots of 10 bytes, last used one, two and three hours ago.
+        for hours, name in enumerate(["a", "b", "c"], start=1):
+            path = os.path.join(BACKUP_DIR, f"{name}.csv")
+            with open(path, "w") as f:
+                f.write("x" * 10)
+            with open(path + META_SUFFIX, "w") as f:
+                json.dump(
+                    {"table": name, "size": 10, "used": time.time() - hours * 3600}, f
+                )
+
+        evict_snapshots(BACKUP_DIR, 15, keep=[os.path.join(BACKUP_DIR, "c.csv")])
+
+        self.assertEqual(
+            sorted(meta["table"] for _, meta in get_cached_snapshots(BACKUP_DIR)),
+            ["c"],
+        )
@@ -0,0 +1,60 @@
+import datetime
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from core.converters import Cast, Concat, Default, ValueMap
+from core.mappers import DeveloperMapper, TechnologyMapper
+from core.scripts import import_data
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+class ConverterTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.df = pd.DataFrame(
+            {
+                "first_name": ["Ada", None, "Alan"],
+                "last_name": ["Lovelace", "Hopper", None],
+                "status": [True, False, None],
+                "score": ["1.5", "x", None],
+                "joined": ["2020-01-02 10:00:00", "nope", None],
+            }
+        )
+
+    def test_value_map(self):
+        converter = ValueMap("status", {True: 1, False: 2}, default=0)
+        self.assertEqual(converter(self.df).tolist(), [1, 2, 0])
+
+    def test_cast(self):
+        self.assertEqual(Cast("score", float)(self.df).tolist()[:1], [1.5])
+        self.assertEqual(Cast("score", "int")(self.df).tolist(), [1, pd.NA, pd.NA])
+        self.assertEqual(Cast("status", "bool")(self.df).tolist(), [True, False, None])
+        self.assertEqual(
+            Cast("joined", "date")(self.df).tolist()[:1], [datetime.date(2020, 1, 2)]
+        )
+
+    def test_unknown_cast(self):
+        with self.assertRaisesMessage(ValueError, "Cannot cast values to 'list'"):
+            Cast("score", list)
+
+    def test_concat_skips_missing_values(self):
+        converter = Concat(["first_name", "last_name"])
+        self.assertEqual(
+            converter(self.df).tolist(), ["Ada Lovelace", "Hopper", "Alan"]
+        )
+
+    def test_nested_converters(self):
+        converter = Default(Concat(["first_name", "missing"], separator="-"), "?")
+        self.assertEqual(converter(self.df).tolist(), ["Ada", "?", "Alan"])
+        self.assertEqual(converter.get_sources(), ["first_name", "missing"])
+
+
+class MethodFieldConverterTests(MigratorTestCase):
+    def test_converter_derives_field_of_imported_rows(self):
+        import_data([TechnologyMapper, DeveloperMapper])
+
+        statuses = dict(models.Developer.objects.values_list("id", "status"))
+        self.assertEqual(statuses[1], models.DeveloperStatusChoice.active)
+        self.assertEqual(statuses[2], models.DeveloperStatusChoice.inactive)
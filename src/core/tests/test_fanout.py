@@ -0,0 +1,102 @@
+from graphlib import TopologicalSorter
+
+from django.core.exceptions import ImproperlyConfigured
+
+from core.base import BaseModelMap, FanOutMap
+from core.fields import ReferenceField
+from core.mappers import TechnologyMapper
+from core.scheduler import Scheduler
+from core.scripts import import_data, import_data_parallel
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+class RoutedDeveloperMapper(BaseModelMap):
+    destmodel = models.Developer
+    sourcetable = "developer"
+    exclude_fields = ["about"]
+
+    technology = ReferenceField(mapper=TechnologyMapper, source="technology_id")
+
+
+class RoutedTeamMapper(BaseModelMap):
+    destmodel = models.Team
+    sourcetable = "developer"
+    renamed_columns = {"title": "last_name"}
+
+
+class RoutedFanOut(FanOutMap):
+    sourcetable = "developer"
+    mappers = [RoutedDeveloperMapper, RoutedTeamMapper]
+
+    def get_mapper_rows(self, mapper, df):
+        # Only active developers lead a team.
+        if isinstance(mapper, RoutedTeamMapper):
+            return df[df["status"] == 1]
+        return df
+
+
+class RoutedMemberMapper(BaseModelMap):
+    destmodel = models.TeamMember
+    sourcetable = "team_members"
+
+    developer = ReferenceField(mapper=RoutedDeveloperMapper, source="developer_id")
+    team = ReferenceField(mapper=RoutedTeamMapper, source="team_id")
+
+
+class FanOutTests(MigratorTestCase):
+    def test_rows_are_routed_to_mappers(self):
+        import_data([TechnologyMapper, RoutedFanOut])
+
+        self.assertEqual(models.Developer.objects.count(), 18)
+        self.assertEqual(
+            list(models.Team.objects.order_by("pk").values_list("pk", "title")),
+            [(pk, f"last {pk}") for pk in range(1, 21, 2)],
+        )
+
+    def test_referencing_mapper_imports_the_fanout_first(self):
+        graph = Scheduler([RoutedMemberMapper]).get_graph()
+        self.assertEqual(
+            list(TopologicalSorter(graph).static_order()),
+            [TechnologyMapper, RoutedFanOut, RoutedMemberMapper],
+        )
+
+        import_data([RoutedMemberMapper])
+
+        # Team 2 is not imported, developer 2 does not lead a team.
+        self.assertEqual(
+            sorted(models.TeamMember.objects.values_list("pk", flat=True)),
+            [pk for pk in range(2, 21, 2) if pk % 5 and pk % 7],
+        )
+
+    def test_listed_mapper_is_imported_by_its_fanout(self):
+        for import_mappers in (import_data, import_data_parallel):
+            with self.subTest(import_mappers=import_mappers.__name__):
+                for model in (models.Developer, models.Team, models.Technology):
+                    model.objects.all().delete()
+                self.clear_state()
+
+                import_mappers([TechnologyMapper, RoutedDeveloperMapper])
+
+                self.assertEqual(models.Developer.objects.count(), 18)
+                self.assertEqual(models.Team.objects.count(), 10)
+
+    def test_mappers_are_checked(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "should import 'team'"):
+
+            class TeamFanOut(FanOutMap):
+                sourcetable = "team"
+                mappers = [RoutedDeveloperMapper]
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "already imported by"):
+
+            class DeveloperFanOut(FanOutMap):
+                sourcetable = "developer"
+                mappers = [RoutedTeamMapper]
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "in the same pass"):
+
+            class MemberFanOut(FanOutMap):
+                sourcetable = "team_members"
+                mappers = [RoutedMemberMapper, RoutedTeamMapper]
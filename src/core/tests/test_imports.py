@@ -0,0 +1,100 @@
+import os
+
+from django.db import connections
+from django.test import override_settings
+
+from core.fastload import fast_load
+from core.mappers import mappers_list
+from core.scripts import import_data
+from core.services import get_snapshot_path
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+# Number of destination rows of the demo mappers, rows which refer to
+# missing keys are rejected.
+EXPECTED_ROWS = {
+    models.Technology: 3,
+    models.Developer: 18,
+    models.Team: 2,
+    models.TeamMember: 14,
+}
+
+
+class ImportTests(MigratorTestCase):
+    def import_rows(self, **settings) -> dict:
+        """
+        Imports the demo mappers with the given settings into empty
+        destination tables, returns the destination rows by model.
+        """
+        for model in reversed(EXPECTED_ROWS):
+            model.objects.all().delete()
+        self.clear_state()
+        with override_settings(DB_MIGRATOR=settings):
+            import_data(mappers_list)
+        return {
+            model: list(model.objects.order_by("pk").values_list())
+            for model in EXPECTED_ROWS
+        }
+
+    def get_indexes(self, model) -> list:
+        connection = connections["default"]
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+        return sorted(
+            name
+            for name, constraint in constraints.items()
+            if constraint["index"] and not constraint["primary_key"]
+        )
+
+    def assert_same_rows(self, rows: dict) -> None:
+        """
+        Checks that rows imported with other settings are the same as the
+        rows imported with the default settings.
+        """
+        self.assertEqual(
+            {model: len(model_rows) for model, model_rows in rows.items()},
+            EXPECTED_ROWS,
+        )
+        self.assertEqual(rows, self.import_rows())
+
+    def test_chunk_size(self):
+        self.assert_same_rows(
+            self.import_rows(IMPORT_CHUNK_SIZE=4, EXPORT_CHUNK_SIZE=3)
+        )
+
+    def test_direct_source_mode(self):
+        rows = self.import_rows(SOURCE_MODE="direct")
+
+        self.assertFalse(os.path.exists(get_snapshot_path("developer")))
+        self.assert_same_rows(rows)
+
+    def test_parquet_snapshots(self):
+        rows = self.import_rows(SNAPSHOT_FORMAT="parquet")
+
+        self.assertTrue(
+            os.path.exists(get_snapshot_path("developer", snapshot_format="parquet"))
+        )
+        self.assert_same_rows(rows)
+
+    def test_mmap_key_index(self):
+        self.assert_same_rows(self.import_rows(KEY_INDEX="mmap"))
+
+    def test_pipeline(self):
+        self.assert_same_rows(self.import_rows(PIPELINE=True, IMPORT_CHUNK_SIZE=4))
+
+    def test_fast_load_keeps_indexes(self):
+        indexes = self.get_indexes(models.TeamMember)
+
+        self.assert_same_rows(self.import_rows(FAST_LOAD=True))
+        self.assertEqual(self.get_indexes(models.TeamMember), indexes)
+
+    def test_fast_load_drops_indexes_while_loading(self):
+        indexes = self.get_indexes(models.TeamMember)
+        self.assertEqual(len(indexes), 2)
+
+        with fast_load([models.TeamMember]):
+            self.assertEqual(self.get_indexes(models.TeamMember), [])
+        self.assertEqual(self.get_indexes(models.TeamMember), indexes)
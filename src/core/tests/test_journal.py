@@ -0,0 +1,63 @@
+from unittest import mock
+
+import pandas as pd
+from django.test import override_settings
+
+from core.base import BaseModelMap
+from core.journal import COMPLETED, CheckpointJournal
+from core.mappers import DeveloperMapper, TechnologyMapper
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+def fail_after(chunks: int):
+    """
+    Returns `add_to_dest_db` which raises an error once the given number
+    of chunks is loaded.
+    """
+    add_to_dest_db = BaseModelMap.add_to_dest_db
+    loaded = []
+
+    def flaky_add_to_dest_db(self, dataset, loader=None):
+        if len(loaded) == chunks:
+            raise RuntimeError("Connection lost")
+        loaded.append(dataset)
+        add_to_dest_db(self, dataset, loader=loader)
+
+    return flaky_add_to_dest_db
+
+
+@override_settings(DB_MIGRATOR={"CHECKPOINTS": True})
+class CheckpointTests(MigratorTestCase):
+    def import_developers(self, pipeline: bool = False) -> DeveloperMapper:
+        mapper = DeveloperMapper()
+        with override_settings(DB_MIGRATOR={"CHECKPOINTS": True, "PIPELINE": pipeline}):
+            mapper.importdata(chunk_size=5)
+        return mapper
+
+    def crash_and_resume(self, pipeline: bool = False) -> DeveloperMapper:
+        TechnologyMapper().importdata()
+        with mock.patch.object(DeveloperMapper, "add_to_dest_db", fail_after(2)):
+            with self.assertRaises(RuntimeError):
+                self.import_developers(pipeline)
+        return self.import_developers(pipeline)
+
+    def test_resumed_import_does_not_duplicate_rows(self):
+        self.crash_and_resume()
+
+        self.assertEqual(models.Developer.objects.count(), 18)
+        checkpoint = CheckpointJournal().get(*DeveloperMapper().get_checkpoint_key())
+        self.assertEqual(checkpoint["status"], COMPLETED)
+        self.assertEqual(checkpoint["rows"], 18)
+
+    def assert_rejected_once(self, mapper: DeveloperMapper) -> None:
+        rejects = pd.read_csv(mapper.rejects.get_file_path())
+        self.assertEqual(rejects["id"].tolist(), [7, 14])
+        self.assertEqual(set(rejects["reject_reason"]), {"technology:null"})
+
+    def test_resumed_import_reports_rejected_rows_once(self):
+        self.assert_rejected_once(self.crash_and_resume())
+
+    def test_resumed_pipeline_import_reports_rejected_rows_once(self):
+        self.assert_rejected_once(self.crash_and_resume(pipeline=True))
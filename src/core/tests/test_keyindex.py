@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core import base
+from core.keyindex import KeyIndex, MmapKeyIndex
+from core.mappers import DeveloperMapper, TechnologyMapper
+from core.services import BACKUP_DIR
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+class KeyIndexLookupTests(SimpleTestCase):
+    def test_lookup_of_arrays_and_single_keys(self):
+        index = KeyIndex(np.array([2, 5, 9], dtype=np.int64))
+
+        self.assertEqual(
+            index.contains([1, 2, 9, 10]).tolist(), [False, True, True, False]
+        )
+        self.assertEqual(index.get(5.0), 5)
+        self.assertIsNone(index.get(None))
+        self.assertNotIn(3, index)
+
+    def test_empty_index(self):
+        index = KeyIndex(np.empty(0, dtype=np.int64))
+
+        self.assertEqual(index.contains([1]).tolist(), [False])
+        self.assertIsNone(index.get(1))
+
+
+class KeyIndexTests(MigratorTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        TechnologyMapper().importdata()
+
+    def test_mmap_index_is_moved_into_place(self):
+        index = MmapKeyIndex.from_model(models.Technology)
+
+        self.assertEqual(index.keys.tolist(), [1, 2, 3])
+        files = [name for name in os.listdir(BACKUP_DIR) if "technology.keys" in name]
+        self.assertEqual(files, ["technology.keys"])
+
+    def test_concurrent_lookups_build_index_once(self):
+        built = []
+        barrier = threading.Barrier(4)
+
+        def build_key_index(model):
+            built.append(model)
+            time.sleep(0.05)
+            return KeyIndex.from_model(model)
+
+        def get_key_index(_):
+            barrier.wait()
+            return DeveloperMapper().get_key_index(TechnologyMapper)
+
+        with mock.patch.object(base, "build_key_index", build_key_index):
+            with ThreadPoolExecutor(4) as executor:
+                indexes = list(executor.map(get_key_index, range(4)))
+
+        self.assertEqual(built, [models.Technology])
+        self.assertTrue(all(index is indexes[0] for index in indexes))
@@ -0,0 +1,54 @@
+from core.base import BaseModelMap
+from core.fields import ReferenceField
+from core.keymap import KeyMap
+from core.scripts import import_data
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+class KeyMapTechnologyMapper(BaseModelMap):
+    destmodel = models.Technology
+    sourcetable = "mst_technology"
+    renamed_columns = {"title": "name"}
+    preserve_pk = False
+
+
+class KeyMapDeveloperMapper(BaseModelMap):
+    destmodel = models.Developer
+    sourcetable = "developer"
+    exclude_fields = ["about"]
+
+    technology = ReferenceField(mapper=KeyMapTechnologyMapper, source="technology_id")
+
+
+class KeyMapTests(MigratorTestCase):
+    # Assigned keys are compared, they should not depend on earlier tests.
+    reset_sequences = True
+
+    def test_lookup(self):
+        key_map = KeyMap("technology")
+        self.addCleanup(key_map.close)
+        key_map.add([1, 2], [11, 12])
+        key_map.add([2], [22])
+
+        found, keys = key_map.lookup([2, 3, 1, 2])
+        self.assertEqual(found.tolist(), [True, False, True, True])
+        self.assertEqual(keys.tolist(), [22, None, 11, 22])
+        self.assertEqual(len(key_map), 2)
+        self.assertIsNone(key_map.get(None))
+
+    def test_references_are_translated_to_assigned_keys(self):
+        models.Technology.objects.create(pk=1, title="existing")
+
+        import_data([KeyMapTechnologyMapper, KeyMapDeveloperMapper])
+
+        key_map = KeyMap(KeyMapTechnologyMapper.get_key_name())
+        self.addCleanup(key_map.close)
+        self.assertEqual(key_map.get_many([1, 2, 3]), {1: 2, 2: 3, 3: 4})
+        self.assertEqual(models.Technology.objects.get(pk=2).title, "technology 1")
+        self.assertEqual(models.Developer.objects.count(), 18)
+        for developer_id, _, _, technology_id, _ in self.source_rows["developer"]:
+            if technology_id is not None:
+                developer = models.Developer.objects.get(pk=developer_id)
+                self.assertEqual(developer.technology_id, technology_id + 1)
@@ -0,0 +1,110 @@
+import os
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+
+from core.benchmark import benchmark_loaders
+from core.loaders import BulkCreateLoader, CopyLoader, get_loader_class
+from core.mappers import DeveloperMapper
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+# PostgreSQL database of the tests, see `dbmigrator.test_settings`.
+POSTGRES = "postgres" in settings.DATABASES
+
+
+class LoaderTests(MigratorTestCase):
+    def test_unknown_loader(self):
+        with self.assertRaisesMessage(ValueError, "Unknown loader 'insert'"):
+            get_loader_class("insert")
+
+    def test_upsert_updates_existing_rows(self):
+        loader = BulkCreateLoader(models.Technology, upsert=True)
+        loader.load([{"id": 1, "title": "a"}, {"id": 2, "title": "b"}])
+        loader.load([{"id": 2, "title": "c"}, {"id": 3, "title": "d"}])
+
+        self.assertEqual(
+            list(models.Technology.objects.order_by("id").values_list("title")),
+            [("a",), ("c",), ("d",)],
+        )
+
+    def test_copy_loader_falls_back_to_bulk_create(self):
+        loader = get_loader_class("copy")(models.Technology)
+        loader.load([{"id": 1, "title": "a"}])
+
+        self.assertEqual(models.Technology.objects.get(pk=1).title, "a")
+
+    def test_benchmark_rolls_back_inserted_rows(self):
+        results = benchmark_loaders(DeveloperMapper)
+
+        self.assertEqual(set(results), {"bulk_create", "copy"})
+        self.assertEqual(results["copy"]["rows"], 18)
+        self.assertEqual(models.Developer.objects.count(), 0)
+        # Related table is imported to resolve references.
+        self.assertEqual(models.Technology.objects.count(), 3)
+        self.assertFalse(os.path.exists(DeveloperMapper().rejects.get_file_path()))
+
+    def test_benchmark_of_empty_table(self):
+        self.execute("DELETE FROM developer")
+        for source_mode in ("snapshot", "direct"):
+            with self.subTest(source_mode=source_mode):
+                with override_settings(DB_MIGRATOR={"SOURCE_MODE": source_mode}):
+                    self.assertEqual(benchmark_loaders(DeveloperMapper), {})
+
+    def test_benchmark_closes_source_connection(self):
+        created = []
+        closed = []
+        create_connection = connections.create_connection
+        load = CopyLoader.load
+
+        def track_connection(alias):
+            created.append(create_connection(alias))
+            return created[-1]
+
+        def check_and_load(loader, dataset):
+            # Source is no longer read once rows are loaded.
+            closed.append(all(connection.connection is None for connection in created))
+            return load(loader, dataset)
+
+        with override_settings(DB_MIGRATOR={"SOURCE_MODE": "direct"}):
+            with mock.patch.object(connections, "create_connection", track_connection):
+                with mock.patch.object(CopyLoader, "load", check_and_load):
+                    results = benchmark_loaders(
+                        DeveloperMapper, rows=4, loaders=["copy"]
+                    )
+
+        self.assertEqual(results["copy"]["rows"], 4)
+        self.assertTrue(created)
+        self.assertEqual(closed, [True])
+
+
+@skipUnless(POSTGRES, "Set DBMIGRATOR_TEST_POSTGRES to test PostgreSQL loaders")
+class PostgresCopyLoaderTests(TransactionTestCase):
+    databases = {"default", "postgres"} if POSTGRES else {"default"}
+
+    def get_titles(self) -> list:
+        technologies = models.Technology.objects.using("postgres").order_by("id")
+        return list(technologies.values_list("id", "title"))
+
+    def test_rows_are_copied(self):
+        loader = CopyLoader(models.Technology, using="postgres")
+        loader.load([{"id": 1, "title": 'say "hi", bye'}, {"id": 2, "title": ""}])
+
+        self.assertEqual(self.get_titles(), [(1, 'say "hi", bye'), (2, "")])
+        self.assertGreater(loader.bytes_written, 0)
+
+    def test_upsert_updates_existing_rows(self):
+        loader = CopyLoader(models.Technology, using="postgres", upsert=True)
+        loader.load([{"id": 1, "title": "a"}, {"id": 2, "title": "b"}])
+        loader.load([{"id": 2, "title": "c"}, {"id": 3, "title": "d"}])
+
+        self.assertEqual(self.get_titles(), [(1, "a"), (2, "c"), (3, "d")])
+
+    def test_keys_are_returned_by_bulk_create(self):
+        loader = CopyLoader(models.Technology, using="postgres", return_keys=True)
+        keys = loader.load([{"title": "a"}, {"title": "b"}])
+
+        self.assertEqual(self.get_titles(), [(keys[0], "a"), (keys[1], "b")])
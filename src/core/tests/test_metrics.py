@@ -0,0 +1,32 @@
+import json
+import os
+
+from core.mappers import DeveloperMapper, TechnologyMapper
+from core.metrics import STAGES, add_hook, remove_hook
+from core.scripts import import_data
+from core.services import BACKUP_DIR
+
+from .utils import MigratorTestCase
+
+
+class MetricsTests(MigratorTestCase):
+    def test_stages_are_measured_and_reported(self):
+        reported = []
+        hook = add_hook(reported.append)
+        self.addCleanup(remove_hook, hook)
+
+        import_data([TechnologyMapper, DeveloperMapper])
+
+        with open(os.path.join(BACKUP_DIR, "run_report.json")) as f:
+            report = json.load(f)
+        self.assertEqual(report["rows"], 21)
+        self.assertEqual(report["rejected"], 2)
+        self.assertEqual(report["mappers"], reported)
+
+        developer = reported[1]
+        self.assertEqual(developer["sourcetable"], "developer")
+        self.assertEqual((developer["rows"], developer["rejected"]), (18, 2))
+        self.assertEqual(list(developer["stages"]), list(STAGES))
+        self.assertEqual(developer["stages"]["load"]["rows"], 18)
+        self.assertGreater(developer["stages"]["export"]["queries"], 0)
+        self.assertGreater(developer["stages"]["write"]["bytes_written"], 0)
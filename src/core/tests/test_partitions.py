@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from core.base import BaseModelMap
+from core.fields import ReferenceField
+from core.mappers import TechnologyMapper
+from core.partitions import get_hash_partitions, get_range_partitions
+from core.scripts import import_data_parallel
+from core.services import DatabaseExportService
+from demoapp import models
+
+from .test_journal import fail_after
+from .utils import MigratorTestCase
+
+
+class PartitionedDeveloperMapper(BaseModelMap):
+    destmodel = models.Developer
+    sourcetable = "developer"
+    exclude_fields = ["about"]
+    partitions = 3
+
+    technology = ReferenceField(mapper=TechnologyMapper, source="technology_id")
+
+
+class PartitionTests(MigratorTestCase):
+    def get_partition_keys(self, partitions) -> list:
+        keys = []
+        for partition in partitions:
+            service = DatabaseExportService("developer", partition=partition)
+            keys.append([row[0] for chunk in service.iter_chunks() for row in chunk])
+        return keys
+
+    def test_range_partitions_split_rows_evenly(self):
+        partitions = get_range_partitions("developer", "id", 3)
+        keys = self.get_partition_keys(partitions)
+
+        self.assertEqual(partitions[0].name, "part1of3")
+        self.assertEqual([len(part) for part in keys], [6, 7, 7])
+        self.assertEqual(sorted(sum(keys, [])), list(range(1, 21)))
+
+    def test_range_partitions_of_small_table(self):
+        self.execute("DELETE FROM developer WHERE id > 2")
+
+        self.assertEqual(len(get_range_partitions("developer", "id", 3)), 2)
+        self.execute("DELETE FROM developer")
+        partitions = get_range_partitions("developer", "id", 3)
+        self.assertEqual([partition.where for partition in partitions], [""])
+
+    def test_hash_partitions_cover_all_rows(self):
+        keys = self.get_partition_keys(get_hash_partitions("id", 4))
+
+        self.assertEqual([len(part) for part in keys], [5, 5, 5, 5])
+        self.assertEqual(sorted(sum(keys, [])), list(range(1, 21)))
+
+    def test_partitions_are_imported_in_parallel(self):
+        import_data_parallel([PartitionedDeveloperMapper], workers=2)
+
+        self.assertEqual(
+            list(models.Developer.objects.order_by("pk").values_list("pk", flat=True)),
+            [pk for pk in range(1, 21) if pk % 7],
+        )
+
+    @override_settings(DB_MIGRATOR={"CHECKPOINTS": True})
+    def test_resumed_partitions_keep_their_ranges(self):
+        TechnologyMapper().importdata()
+        with mock.patch.object(BaseModelMap, "add_to_dest_db", fail_after(3)):
+            with self.assertRaises(RuntimeError):
+                import_data_parallel([PartitionedDeveloperMapper], chunk_size=4)
+        # Recomputed boundaries would be 14 and 27 instead of 7 and 14,
+        # partitions would then overlap with the rows already imported.
+        for pk in range(21, 41):
+            self.execute(
+                "INSERT INTO developer VALUES (%s, 'first', 'last', 1, 1)", [pk]
+            )
+        import_data_parallel([PartitionedDeveloperMapper], chunk_size=4)
+
+        self.assertEqual(
+            list(models.Developer.objects.order_by("pk").values_list("pk", flat=True)),
+            [pk for pk in range(1, 41) if pk not in (7, 14)],
+        )
@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+
+from core.pipeline import Pipeline
+
+
+def fail_after(items: int):
+    yield from range(items)
+    raise RuntimeError("Source lost")
+
+
+class PipelineTests(SimpleTestCase):
+    def test_items_pass_through_stages_in_order(self):
+        with Pipeline(depth=2) as pipeline:
+            numbers = pipeline.add(range(10))
+            squares = pipeline.add(number * number for number in numbers)
+            self.assertEqual(list(squares), [number * number for number in range(10)])
+
+    def test_error_of_a_stage_is_raised_by_consumer(self):
+        with Pipeline(depth=1) as pipeline:
+            stage = pipeline.add(fail_after(3))
+            with self.assertRaisesMessage(RuntimeError, "Source lost"):
+                list(stage)
+
+    def test_closing_stops_stages(self):
+        with Pipeline(depth=1) as pipeline:
+            stage = pipeline.add(iter(range(1000)))
+            next(stage)
+
+        self.assertFalse(any(stage.thread.is_alive() for stage in pipeline.stages))
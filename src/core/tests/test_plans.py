@@ -0,0 +1,77 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from core.base import BaseModelMap
+from core.fields import MethodField, ReferenceField
+from core.mappers import DeveloperMapper, TechnologyMapper
+from core.plans import FieldRule
+from demoapp import models
+
+
+class FieldPlanTests(SimpleTestCase):
+    def get_rules(self, mapper_class) -> dict:
+        return {
+            rule.name: (rule.kind, rule.source, rule.attname)
+            for rule in mapper_class().get_field_plan()
+        }
+
+    def test_rules_of_mapper_fields(self):
+        self.assertEqual(
+            self.get_rules(DeveloperMapper),
+            {
+                "id": (FieldRule.PASSTHROUGH, "id", "id"),
+                "first_name": (FieldRule.PASSTHROUGH, "first_name", "first_name"),
+                "last_name": (FieldRule.PASSTHROUGH, "last_name", "last_name"),
+                "about": (FieldRule.EXCLUDE, None, "about"),
+                "status": (FieldRule.CONVERT, None, "status"),
+                "technology": (
+                    FieldRule.REFERENCE,
+                    "technology_id",
+                    "technology_id",
+                ),
+            },
+        )
+        self.assertEqual(
+            self.get_rules(TechnologyMapper)["title"],
+            (FieldRule.RENAME, "name", "title"),
+        )
+
+    def test_plan_is_compiled_once_per_class(self):
+        self.assertIs(
+            DeveloperMapper().get_field_plan(), DeveloperMapper().get_field_plan()
+        )
+
+
+class CheckMapperTests(SimpleTestCase):
+    def test_unknown_field(self):
+        message = "'nickname' in `exclude_fields` is not a field of demoapp.Developer"
+        with self.assertRaisesMessage(ImproperlyConfigured, message):
+
+            class UnknownFieldMapper(BaseModelMap):
+                destmodel = models.Developer
+                sourcetable = "developer"
+                exclude_fields = ["nickname"]
+
+    def test_primary_key_cannot_be_excluded(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "cannot be excluded"):
+
+            class NoKeyMapper(BaseModelMap):
+                destmodel = models.Technology
+                sourcetable = "mst_technology"
+                exclude_fields = ["id"]
+
+    def test_reference_field_should_be_foreign_key(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "should be a foreign key"):
+
+            class ReferenceMapper(BaseModelMap):
+                destmodel = models.Developer
+                sourcetable = "developer"
+                first_name = ReferenceField(mapper=TechnologyMapper, source="id")
+
+    def test_method_field_needs_method(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "get_about_value"):
+
+            class MethodMapper(BaseModelMap):
+                destmodel = models.Developer
+                sourcetable = "developer"
+                about = MethodField()
@@ -0,0 +1,44 @@
+import pandas as pd
+from django.test import override_settings
+
+from core.mappers import DeveloperMapper, TeamMapper, TeamMember, TechnologyMapper
+from core.metrics import RUN_REPORT
+from core.scripts import import_data
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+class RejectReportTests(MigratorTestCase):
+    def test_rows_with_unresolved_references_are_rejected(self):
+        import_data([TechnologyMapper, DeveloperMapper, TeamMapper, TeamMember])
+
+        rejects = pd.read_csv(TeamMember().rejects.get_file_path())
+        self.assertEqual(rejects["id"].tolist(), [5, 7, 10, 14, 15, 20])
+        self.assertEqual(set(rejects["reject_reason"]), {"developer:missing"})
+        self.assertEqual(set(rejects["reject_mapper"]), {"core.mappers.TeamMember"})
+
+    def test_reject_reasons_are_added_to_run_report(self):
+        import_data([TechnologyMapper, DeveloperMapper, TeamMapper, TeamMember])
+
+        mappers = {
+            data["sourcetable"]: data for data in RUN_REPORT.as_dict()["mappers"]
+        }
+        self.assertEqual(mappers["developer"]["rejected"], 2)
+        self.assertEqual(mappers["developer"]["reject_reasons"], {"technology:null": 2})
+        self.assertEqual(mappers["mst_technology"]["reject_reasons"], {})
+
+    def test_values_which_do_not_fit_column_types_are_rejected(self):
+        self.execute("UPDATE developer SET technology_id = 'unknown' WHERE id = 3")
+        for engine in ("c", "pyarrow"):
+            with self.subTest(engine=engine):
+                self.clear_state()
+                models.Developer.objects.all().delete()
+                models.Technology.objects.all().delete()
+                with override_settings(DB_MIGRATOR={"CSV_ENGINE": engine}):
+                    with self.assertLogs("dbmigrator", "WARNING"):
+                        import_data([TechnologyMapper, DeveloperMapper])
+
+                rejects = pd.read_csv(DeveloperMapper().rejects.get_file_path())
+                self.assertEqual(rejects["id"].tolist(), [3, 7, 14])
+                self.assertEqual(models.Developer.objects.count(), 17)
@@ -0,0 +1,48 @@
+from django.test import override_settings
+
+from core.base import BaseModelMap
+from core.keymap import KeyMap
+from core.mappers import mappers_list
+from core.scheduler import Scheduler
+from core.scripts import import_data_parallel
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+class PartitionedTechnologyMapper(BaseModelMap):
+    destmodel = models.Technology
+    sourcetable = "mst_technology"
+    renamed_columns = {"title": "name"}
+    preserve_pk = False
+    partitions = 2
+    partition_by = "hash"
+
+
+class SchedulerTests(MigratorTestCase):
+    def test_mappers_are_imported_in_dependency_order(self):
+        order = list(Scheduler(list(reversed(mappers_list))).get_graph())
+        self.assertLess(order.index(mappers_list[0]), order.index(mappers_list[1]))
+
+        import_data_parallel(mappers_list, workers=2)
+
+        self.assertEqual(models.Developer.objects.count(), 18)
+        self.assertEqual(models.TeamMember.objects.count(), 14)
+
+    def import_partitions(self) -> KeyMap:
+        import_data_parallel([PartitionedTechnologyMapper], workers=1)
+        return KeyMap(PartitionedTechnologyMapper.get_key_name())
+
+    def test_key_map_of_previous_run_is_reset(self):
+        for checkpoints in (False, True):
+            with self.subTest(checkpoints=checkpoints):
+                self.clear_state()
+                stale = KeyMap(PartitionedTechnologyMapper.get_key_name())
+                stale.add([99], [99])
+                stale.close()
+                with override_settings(DB_MIGRATOR={"CHECKPOINTS": checkpoints}):
+                    key_map = self.import_partitions()
+
+                self.assertNotIn(99, key_map)
+                self.assertEqual(len(key_map), 3)
+                key_map.close()
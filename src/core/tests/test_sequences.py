@@ -0,0 +1,45 @@
+from unittest import mock
+
+from django.db import connections
+from django.test import override_settings
+
+from core.mappers import DeveloperMapper, TeamMember, mappers_list
+from core.scripts import import_data, reset_sequences
+from demoapp import models
+
+from .test_keymap import KeyMapDeveloperMapper, KeyMapTechnologyMapper
+from .utils import MigratorTestCase
+
+
+class SequenceTests(MigratorTestCase):
+    # Assigned keys are compared, they should not depend on earlier tests.
+    reset_sequences = True
+
+    def get_reset_models(self, mappers) -> set:
+        ops = connections["default"].ops
+        with mock.patch.object(ops, "sequence_reset_sql", return_value=[]) as reset:
+            reset_sequences(mappers)
+        return set(reset.call_args.args[1])
+
+    def test_sequences_of_preserved_keys_are_reset(self):
+        self.assertEqual(
+            self.get_reset_models([TeamMember]),
+            {models.Technology, models.Developer, models.Team, models.TeamMember},
+        )
+        self.assertEqual(
+            self.get_reset_models([KeyMapTechnologyMapper, KeyMapDeveloperMapper]),
+            {models.Developer},
+        )
+
+    def test_sequences_are_reset_after_import(self):
+        with mock.patch("core.scripts.reset_sequences") as reset:
+            import_data([DeveloperMapper])
+            with override_settings(DB_MIGRATOR={"RESET_SEQUENCES": False}):
+                import_data([DeveloperMapper])
+        reset.assert_called_once_with([DeveloperMapper])
+
+    def test_new_rows_do_not_collide_with_imported_ones(self):
+        import_data(mappers_list)
+
+        technology = models.Technology.objects.create(title="new")
+        self.assertEqual(technology.pk, 4)
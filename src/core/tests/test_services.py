@@ -0,0 +1,57 @@
+import pandas as pd
+
+from core.mappers import DeveloperMapper
+from core.services import DatabaseExportService
+
+from .utils import MigratorTestCase
+
+
+class DatabaseExportServiceTests(MigratorTestCase):
+    def test_iter_chunks_streams_rows_in_chunks(self):
+        service = DatabaseExportService("developer", chunk_size=6)
+        chunks = list(service.iter_chunks())
+
+        self.assertEqual([len(rows) for rows in chunks], [6, 6, 6, 2])
+        self.assertEqual(
+            service.columns,
+            ["id", "first_name", "last_name", "technology_id", "status"],
+        )
+
+    def test_export_writes_all_rows_to_snapshot(self):
+        service = DatabaseExportService("developer", chunk_size=6)
+        service.export()
+
+        df = pd.read_csv(service.get_file_path())
+        self.assertEqual(df["id"].tolist(), list(range(1, 21)))
+
+    def test_export_query_selects_columns_filters_and_ordering(self):
+        service = DatabaseExportService(
+            "developer",
+            filters=[("id > %s", [15])],
+            order_by="-id",
+            select_columns=["id", "first_name"],
+        )
+        rows = [row for chunk in service.iter_chunks() for row in chunk]
+
+        self.assertEqual(service.columns, ["id", "first_name"])
+        self.assertEqual([row[0] for row in rows], [20, 19, 18, 17, 16])
+
+
+class SchemaDeveloperMapper(DeveloperMapper):
+    sourcetable = "main.developer"
+
+
+class ExportColumnsTests(MigratorTestCase):
+    def test_only_mapped_columns_are_exported(self):
+        self.execute("ALTER TABLE developer ADD COLUMN notes TEXT")
+
+        self.assertEqual(
+            DeveloperMapper().get_export_columns(),
+            ["id", "first_name", "last_name", "technology_id", "status"],
+        )
+
+    def test_source_table_may_include_schema(self):
+        self.assertEqual(
+            SchemaDeveloperMapper().get_source_columns(),
+            ["id", "first_name", "last_name", "technology_id", "status"],
+        )
@@ -0,0 +1,121 @@
+import datetime
+import os
+from decimal import Decimal
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from core.base import BaseModelMap
+from core.fields import MethodField, ReferenceField
+from core.mappers import DeveloperMapper, TeamMember, TechnologyMapper
+from core.plans import compile_dtype_plan
+from core.services import BACKUP_DIR
+from core.snapshots import CsvSnapshot, ParquetSnapshot
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+class DeveloperAboutMapper(BaseModelMap):
+    destmodel = models.Developer
+    sourcetable = "developer"
+
+    about = MethodField()
+    status = MethodField()
+    technology = ReferenceField(mapper=TechnologyMapper, source="technology_id")
+
+    def get_about_value(self, row):
+        if row["technology_id"]:
+            return f"{row['first_name']} uses technology {row['technology_id']}"
+        return None
+
+    def get_status_value(self, row):
+        return 1 if row["status"] else 2
+
+
+class CsvSnapshotTests(SimpleTestCase):
+    def setUp(self) -> None:
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        self.snapshot = CsvSnapshot(os.path.join(BACKUP_DIR, "snapshot-test.csv"))
+        self.snapshot.open(["id", "name", "joined"])
+        self.snapshot.write(
+            [[1, "a", "2020-01-01 10:00:00"], [2, None, None], [3, "c", None]]
+        )
+        self.snapshot.close()
+        self.addCleanup(os.remove, self.snapshot.path)
+
+    def read(self, **options) -> pd.DataFrame:
+        return pd.concat(list(self.snapshot.read_chunks(2, **options)))
+
+    def test_dtype_plan_is_applied(self):
+        for engine in ("c", "pyarrow"):
+            with self.subTest(engine=engine):
+                df = self.read(
+                    dtypes={"id": "Int64", "name": "string", "joined": "datetime"},
+                    engine=engine,
+                )
+
+                self.assertEqual(df["id"].dtype, pd.Int64Dtype())
+                self.assertIsInstance(df["name"].dtype, pd.StringDtype)
+                self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["joined"]))
+
+    def test_types_of_columns_not_in_file_are_ignored(self):
+        for engine in ("c", "pyarrow"):
+            with self.subTest(engine=engine):
+                df = self.read(
+                    columns=["id", "name", "left"],
+                    dtypes={"joined": "datetime", "left": "datetime", "id": "Int64"},
+                    engine=engine,
+                )
+
+                self.assertEqual(df["id"].tolist(), [1, 2, 3])
+                self.assertNotIn("joined", df.columns)
+
+
+class ParquetSnapshotTests(SimpleTestCase):
+    def test_types_are_widened_by_later_chunks(self):
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        snapshot = ParquetSnapshot(os.path.join(BACKUP_DIR, "snapshot-test.parquet"))
+        self.addCleanup(os.remove, snapshot.path)
+        joined = datetime.datetime(2020, 1, 1, 10)
+        small = Decimal("1.25")
+        large = Decimal("123456789012345678901234.123456789012345678901")
+        snapshot.open(["id", "joined", "amount", "note"])
+        snapshot.write([[1, None, small, None], [2, None, None, None]])
+        snapshot.write([[3, joined, large, None]])
+        snapshot.close()
+
+        df = pd.concat(list(snapshot.read_chunks(2)))
+
+        self.assertEqual(df["id"].tolist(), [1, 2, 3])
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["joined"]))
+        self.assertEqual(df["joined"].iloc[2], joined)
+        self.assertEqual(df["amount"].tolist()[::2], [small, large])
+        self.assertIsInstance(df["note"].dtype, pd.StringDtype)
+
+
+class DtypePlanTests(SimpleTestCase):
+    def test_dtype_plan_follows_destination_fields(self):
+        self.assertEqual(
+            compile_dtype_plan(DeveloperMapper()),
+            {
+                "id": "Int64",
+                "first_name": "string",
+                "last_name": "string",
+                "technology_id": "Int64",
+            },
+        )
+        self.assertEqual(
+            compile_dtype_plan(TeamMember()),
+            {"id": "Int64", "developer_id": "Int64", "team_id": "Int64"},
+        )
+
+
+class MethodFieldTests(MigratorTestCase):
+    def test_row_methods_get_python_values(self):
+        DeveloperAboutMapper().importdata()
+
+        developer = models.Developer.objects.get(pk=1)
+        self.assertEqual(developer.about, "first 1 uses technology 2")
+        self.assertEqual(developer.status, 1)
+        self.assertEqual(models.Developer.objects.filter(status=2).count(), 9)
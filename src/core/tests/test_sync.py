@@ -0,0 +1,49 @@
+from unittest import mock
+
+from core.mappers import DeveloperMapper, TechnologyMapper, mappers_list
+from core.scripts import reset_checkpoints, sync_data
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+class SyncTests(MigratorTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        for mapper_class in mappers_list:
+            self.enterContext(mock.patch.object(mapper_class, "watermark_column", "id"))
+
+    def test_sync_imports_new_rows_only(self):
+        sync_data(mappers_list)
+        self.assertEqual(models.Developer.objects.count(), 18)
+
+        self.execute("INSERT INTO mst_technology VALUES (4, 'technology 4')")
+        self.execute("INSERT INTO developer VALUES (21, 'first 21', 'last 21', 4, 1)")
+        # Rows below the watermark are not read again.
+        self.execute("UPDATE developer SET first_name = 'changed' WHERE id = 1")
+        sync_data(mappers_list)
+
+        self.assertEqual(models.Developer.objects.count(), 19)
+        self.assertEqual(models.Developer.objects.get(pk=21).technology_id, 4)
+        self.assertEqual(models.Developer.objects.get(pk=1).first_name, "first 1")
+        self.assertEqual(models.Technology.objects.count(), 4)
+
+    def test_sync_updates_existing_rows(self):
+        sync_data(mappers_list)
+        self.execute("UPDATE developer SET first_name = 'changed' WHERE id = 5")
+        # Without the watermark of the previous sync, all rows are read.
+        reset_checkpoints()
+        sync_data(mappers_list)
+
+        self.assertEqual(models.Developer.objects.count(), 18)
+        self.assertEqual(models.Developer.objects.get(pk=5).first_name, "changed")
+
+    def test_sync_requires_watermark_column(self):
+        with mock.patch.object(TechnologyMapper, "watermark_column", None):
+            with self.assertRaisesMessage(ValueError, "Add `watermark_column`"):
+                TechnologyMapper().syncdata()
+
+    def test_sync_requires_preserved_keys(self):
+        with mock.patch.object(DeveloperMapper, "preserve_pk", False):
+            with self.assertRaisesMessage(ValueError, "`preserve_pk` is set"):
+                DeveloperMapper().syncdata()
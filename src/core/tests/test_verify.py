@@ -0,0 +1,96 @@
+import os
+
+from core.base import BaseModelMap, FanOutMap
+from core.fields import ReferenceField
+from core.mappers import DeveloperMapper, TechnologyMapper
+from core.rejects import RejectReport
+from core.scripts import import_data
+from core.services import BACKUP_DIR
+from core.verify import TableChecksum, Verifier
+from demoapp import models
+
+from .utils import MigratorTestCase
+
+
+class FanOutDeveloperMapper(BaseModelMap):
+    destmodel = models.Developer
+    sourcetable = "developer"
+    exclude_fields = ["about"]
+
+    technology = ReferenceField(mapper=TechnologyMapper, source="technology_id")
+
+
+class DeveloperTeamMapper(BaseModelMap):
+    destmodel = models.Team
+    sourcetable = "developer"
+    renamed_columns = {"title": "last_name"}
+
+
+class DeveloperFanOut(FanOutMap):
+    sourcetable = "developer"
+    mappers = [FanOutDeveloperMapper, DeveloperTeamMapper]
+
+
+class VerifierTests(MigratorTestCase):
+    def test_imported_table_matches_source(self):
+        import_data([TechnologyMapper, DeveloperMapper])
+        result = Verifier(DeveloperMapper, chunk_size=6).run()
+
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["checksums"], "compared")
+        self.assertEqual(
+            (result["source_rows"], result["rejected_rows"], result["dest_rows"]),
+            (20, 2, 18),
+        )
+
+    def test_changed_missing_and_unexpected_rows_are_reported(self):
+        import_data([TechnologyMapper, DeveloperMapper])
+        self.execute(
+            "UPDATE developer SET first_name = 'x' WHERE id = 2", using="default"
+        )
+        self.execute("DELETE FROM developer WHERE id = 9", using="default")
+        self.execute("UPDATE developer SET id = 14 WHERE id = 15", using="default")
+        result = Verifier(DeveloperMapper, chunk_size=6).run()
+
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["changed"]["keys"], [2])
+        self.assertEqual(result["missing"]["keys"], [9, 15])
+        self.assertEqual(result["unexpected"]["keys"], [14])
+
+    def test_fanout_rejects_are_counted_for_their_mapper(self):
+        import_data([TechnologyMapper, DeveloperFanOut])
+
+        developers = Verifier(FanOutDeveloperMapper).run()
+        teams = Verifier(DeveloperTeamMapper).run()
+
+        self.assertTrue(developers["ok"])
+        self.assertEqual(developers["rejected_rows"], 2)
+        self.assertTrue(teams["ok"])
+        self.assertEqual(teams["rejected_rows"], 0)
+        self.assertEqual(teams["dest_rows"], 20)
+
+    def test_reject_reports_of_previous_runs_are_removed(self):
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        stale = os.path.join(BACKUP_DIR, "developer.part1of3.rejects.csv")
+        with open(stale, "w") as f:
+            f.write("id,reject_reason,reject_mapper\n1,technology:null,x\n")
+
+        import_data([TechnologyMapper, DeveloperMapper])
+
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(RejectReport("developer").get_file_path()))
+        self.assertTrue(Verifier(DeveloperMapper).run()["ok"])
+
+    def test_chunks_of_real_keys_are_integers(self):
+        self.execute("CREATE TABLE real_keys (id REAL PRIMARY KEY, name TEXT)")
+        self.addCleanup(self.execute, "DROP TABLE real_keys")
+        self.execute(
+            "INSERT INTO real_keys VALUES (1, 'a'), (2.5, 'b'), (4, 'c'), (7, 'd')"
+        )
+        checksum = TableChecksum("source", "real_keys", "id", [("name", "text")])
+
+        chunks = checksum.get_chunks(1, 3)
+
+        self.assertEqual(
+            {chunk: values[0] for chunk, values in chunks.items()}, {0: 2, 1: 1, 2: 1}
+        )
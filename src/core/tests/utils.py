@@ -0,0 +1,96 @@
+import io
+import os
+import shutil
+from contextlib import redirect_stdout
+
+from django.db import connections
+from django.test import TransactionTestCase
+
+from core.base import DATASET, IMPORTED_TABLES
+from core.journal import CheckpointJournal
+from core.services import BACKUP_DIR
+
+# Tables of the source database, shaped like the tables of
+# `old/previous-db.sql`.
+SOURCE_TABLES = {
+    "mst_technology": "id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL",
+    "developer": (
+        "id INTEGER PRIMARY KEY, first_name VARCHAR(100), "
+        "last_name VARCHAR(100), technology_id INTEGER, status BOOLEAN"
+    ),
+    "team": "id INTEGER PRIMARY KEY, title VARCHAR(100)",
+    "team_members": "id INTEGER PRIMARY KEY, developer_id INTEGER, team_id INTEGER",
+}
+
+
+class SourceRouter:
+    """
+    Keeps tables of the destination models out of the source database.
+    """
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != "source"
+
+
+def get_source_rows(developers: int = 20) -> dict:
+    """
+    Returns rows of the source tables. Every 7th developer has no
+    technology and every 5th team member refers to a missing developer.
+    """
+    return {
+        "mst_technology": [(i, f"technology {i}") for i in range(1, 4)],
+        "developer": [
+            (i, f"first {i}", f"last {i}", None if i % 7 == 0 else i % 3 + 1, i % 2)
+            for i in range(1, developers + 1)
+        ],
+        "team": [(i, f"team {i}") for i in range(1, 3)],
+        "team_members": [
+            (i, developers + i if i % 5 == 0 else i, i % 2 + 1)
+            for i in range(1, developers + 1)
+        ],
+    }
+
+
+class MigratorTestCase(TransactionTestCase):
+    """
+    Creates the source tables before each test and removes them along with
+    the checkpoint journal and the files written to the backups directory
+    afterwards. Progress messages of the imports are not printed.
+    """
+
+    databases = {"default", "source"}
+    developers = 20
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.enterContext(redirect_stdout(io.StringIO()))
+        self.clear_state()
+        self.source_rows = get_source_rows(self.developers)
+        with connections["source"].cursor() as cursor:
+            for table, columns in SOURCE_TABLES.items():
+                cursor.execute(f"CREATE TABLE {table} ({columns})")
+                rows = self.source_rows[table]
+                placeholders = ", ".join(["%s"] * len(rows[0]))
+                cursor.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+
+    def tearDown(self) -> None:
+        with connections["source"].cursor() as cursor:
+            for table in SOURCE_TABLES:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        self.execute(f"DROP TABLE IF EXISTS {CheckpointJournal.table}", using="default")
+        self.clear_state()
+        super().tearDown()
+
+    def clear_state(self) -> None:
+        for key_index in DATASET.values():
+            close = getattr(key_index, "close", None)
+            if close is not None:
+                close()
+        DATASET.clear()
+        IMPORTED_TABLES.clear()
+        if os.path.isdir(BACKUP_DIR):
+            shutil.rmtree(BACKUP_DIR)
+
+    def execute(self, sql: str, params=None, using: str = "source") -> None:
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, params)
@@ -0,0 +1,470 @@
+import os
+import time
+from typing import Optional
+
+import pandas as pd
+from django.db import connections
+
+from .conf import get_setting
+from .metrics import logger
+from .partitions import get_partitions
+from .plans import FieldRule
+from .rejects import RejectReport
+from .services import DatabaseExportService
+
+# Normalization of compared values by internal type of the destination
+# field, values are turned into the same text in both databases. Columns of
+# other types are not compared.
+CHECKSUM_TYPES = {
+    "AutoField": "integer",
+    "BigAutoField": "integer",
+    "SmallAutoField": "integer",
+    "IntegerField": "integer",
+    "BigIntegerField": "integer",
+    "SmallIntegerField": "integer",
+    "PositiveIntegerField": "integer",
+    "PositiveBigIntegerField": "integer",
+    "PositiveSmallIntegerField": "integer",
+    "BooleanField": "boolean",
+    # Compared up to 6 decimal places.
+    "FloatField": "number",
+    "DecimalField": "number",
+    # Compared up to seconds.
+    "DateField": "datetime",
+    "DateTimeField": "datetime",
+    "CharField": "text",
+    "TextField": "text",
+    "SlugField": "text",
+    "UUIDField": "uuid",
+}
+
+# SQL which differs between databases: seconds since epoch of a timestamp
+# and 32-bit integer read from hexadecimal digest at the given position.
+VENDOR_SQL = {
+    "postgresql": {
+        "datetime": "FLOOR(EXTRACT(EPOCH FROM {0}))",
+        "hex32": "('x' || SUBSTR({0}, {1}, 8))::bit(32)::bigint",
+        # Casting numeric values to bigint rounds them.
+        "chunk": "CAST(FLOOR(({0} - %s) / %s) AS BIGINT)",
+    },
+    "sqlite": {
+        "datetime": "strftime('%%s', {0})",
+        "hex32": "DBMIGRATOR_HEX32({0}, {1})",
+        # Keys are not below the lowest key, truncating is flooring.
+        "chunk": "CAST(({0} - %s) / %s AS INTEGER)",
+    },
+}
+
+# Checksum of a chunk without rows: number of rows and two sums of hashes.
+EMPTY_CHUNK = (0, 0, 0)
+
+
+def sqlite_hex32(digest, start):
+    if digest is None:
+        return None
+    return int(digest[start - 1 : start + 7], 16)
+
+
+class TableChecksum:
+    """
+    Computes checksums of rows of a table inside its database, so that
+    rows do not need to be fetched to compare two tables.
+
+    Each row is turned into text of its normalized values and hashed with
+    MD5. Rows are grouped into chunks by ranges of integer primary key, a
+    checksum of a chunk is the number of its rows and two sums of 32-bit
+    parts of their hashes. Sums do not depend on the order of rows and
+    rows of the whole table are grouped in a single query.
+    """
+
+    def __init__(self, using, table, pk, columns, where="", params=None) -> None:
+        self.using = using
+        # Source tables are used as they are (they may include a schema).
+        self.table = table
+        self.pk = pk
+        # List of `(column, kind)`, see `CHECKSUM_TYPES`. Column is `None`
+        # if it is not present in the table.
+        self.columns = columns
+        self.where = where
+        self.params = params or []
+
+    @property
+    def connection(self):
+        # Connections are not shared between threads.
+        connection = connections[self.using]
+        if connection.vendor == "sqlite":
+            connection.ensure_connection()
+            connection.connection.create_function(
+                "DBMIGRATOR_HEX32", 2, sqlite_hex32, deterministic=True
+            )
+        return connection
+
+    def get_value_sql(self, connection, column, kind) -> str:
+        if column is None:
+            return "NULL"
+        column = connection.ops.quote_name(column)
+        if kind == "integer":
+            return f"CAST({column} AS BIGINT)"
+        if kind == "number":
+            return f"CAST(ROUND({column} * 1000000) AS BIGINT)"
+        if kind == "boolean":
+            text = f"CAST({column} AS TEXT)"
+            return (
+                f"CASE {text} WHEN 'true' THEN '1' WHEN 'false' THEN '0' "
+                f"ELSE {text} END"
+            )
+        if kind == "datetime":
+            seconds = VENDOR_SQL[connection.vendor]["datetime"].format(column)
+            return f"CAST({seconds} AS BIGINT)"
+        if kind == "uuid":
+            return f"REPLACE(LOWER(CAST({column} AS TEXT)), '-', '')"
+        return column
+
+    def get_row_sql(self, connection) -> str:
+        """
+        Returns SQL of the MD5 digest of a row. Empty text and NULL are
+        treated as the same value, CSV snapshots do not tell them apart.
+        """
+        values = [(self.pk, "integer")] + list(self.columns)
+        texts = [
+            "COALESCE(NULLIF(CAST({0} AS TEXT), ''), '\\N')".format(
+                self.get_value_sql(connection, column, kind)
+            )
+            for column, kind in values
+        ]
+        return "MD5({0})".format(" || '|' || ".join(texts))
+
+    def get_where(self, condition: str) -> str:
+        if self.where:
+            return f"{self.where} AND ({condition})"
+        return f" WHERE {condition}"
+
+    def get_stats(self) -> tuple:
+        """
+        Returns number of rows, smallest and largest primary key.
+        """
+        connection = self.connection
+        pk = connection.ops.quote_name(self.pk)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*), MIN({0}), MAX({0}) FROM {1}{2}".format(
+                    pk, self.table, self.where
+                ),
+                self.params,
+            )
+            return cursor.fetchone()
+
+    def get_chunks(self, low: int, width: int, keys=None) -> dict:
+        """
+        Returns checksums of chunks by their number, chunk `n` holds keys
+        from `low + n * width` up to `low + (n + 1) * width`. Only rows of
+        the given keys are included if they are set.
+        """
+        connection = self.connection
+        pk = connection.ops.quote_name(self.pk)
+        where, params = self.where, list(self.params)
+        if keys is not None:
+            placeholders = ", ".join(["%s"] * len(keys))
+            where = self.get_where(f"{pk} IN ({placeholders})")
+            params.extend(keys)
+        vendor_sql = VENDOR_SQL[connection.vendor]
+        hex32 = vendor_sql["hex32"]
+        # Chunk numbers are integers whatever the type of the primary key.
+        query = (
+            "SELECT chunk, COUNT(*), SUM({0}), SUM({1}) FROM ("
+            "SELECT {2} AS chunk, {3} AS digest FROM {4}{5}"
+            ") chunk_rows GROUP BY chunk"
+        ).format(
+            hex32.format("digest", 1),
+            hex32.format("digest", 9),
+            vendor_sql["chunk"].format(pk),
+            self.get_row_sql(connection),
+            self.table,
+            where,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(query, [low, width] + params)
+            return {
+                chunk: (count, int(first), int(second))
+                for chunk, count, first, second in cursor.fetchall()
+            }
+
+    def get_rows(self, start: int, end: int) -> dict:
+        """
+        Returns MD5 digests of the rows with keys from `start` up to `end`
+        by primary key.
+        """
+        connection = self.connection
+        pk = connection.ops.quote_name(self.pk)
+        where = self.get_where(f"{pk} >= %s AND {pk} < %s")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT {0}, {1} FROM {2}{3}".format(
+                    pk, self.get_row_sql(connection), self.table, where
+                ),
+                self.params + [start, end],
+            )
+            return dict(cursor.fetchall())
+
+
+class Verifier:
+    """
+    Compares the destination table of a mapper with its source table once
+    the import is done.
+
+    Number of source rows (matching `source_filter`) less the number of
+    rejected rows (see `RejectReport`) should match the number of
+    destination rows. If primary keys are preserved, values of the
+    columns which are copied as they are (plain, renamed and reference
+    fields) are compared by chunk checksums computed in both databases
+    (see `TableChecksum`), rejected rows are subtracted from the source
+    checksums. Only rows of chunks whose checksums differ are fetched, to
+    report keys which are missing in the destination table, unexpected
+    there or changed. Method fields are not compared.
+
+    Rows which a fan-out does not pass to a mapper (see
+    `FanOutMap.get_mapper_rows`) are reported as missing, rows which other
+    mappers write to the same destination table as unexpected.
+    """
+
+    # Number of keys of each kind listed in the result.
+    max_keys = 100
+    # Number of rejected keys whose checksums are computed by one query.
+    batch_size = 500
+
+    def __init__(self, mapper_class, chunk_size=None) -> None:
+        self.mapper_class = mapper_class
+        self.mapper = mapper_class()
+        # Mappers of a fan-out are exported with options of the fan-out.
+        self.importer_class = mapper_class.get_importer()
+        self.chunk_size = chunk_size or get_setting("VERIFY_CHUNK_SIZE")
+
+    def get_source_pk(self) -> Optional[str]:
+        """
+        Returns source column which is copied to the destination primary
+        key, or `None` if it is derived by a method.
+        """
+        opts = self.mapper.destmodel._meta
+        for rule in self.mapper.get_field_plan():
+            if rule.name == opts.pk.name:
+                if rule.kind in (FieldRule.PASSTHROUGH, FieldRule.RENAME):
+                    return rule.source
+                return None
+        return self.mapper.source_pk
+
+    def get_columns(self) -> tuple:
+        """
+        Returns compared columns as `(source column, destination column,
+        kind)` and names of fields which are not compared.
+        """
+        opts = self.mapper.destmodel._meta
+        source_columns = set(self.mapper.get_source_columns())
+        columns = []
+        skipped = []
+        for rule in self.mapper.get_field_plan():
+            if rule.kind == FieldRule.EXCLUDE or rule.name == opts.pk.name:
+                continue
+            if rule.kind not in (
+                FieldRule.PASSTHROUGH,
+                FieldRule.RENAME,
+                FieldRule.REFERENCE,
+            ):
+                skipped.append(rule.name)
+                continue
+            field = opts.get_field(rule.name)
+            if rule.kind == FieldRule.REFERENCE:
+                if not rule.field.mapper.preserve_pk:
+                    # Keys of the related rows are assigned by the database.
+                    skipped.append(rule.name)
+                    continue
+                field = field.target_field
+            kind = CHECKSUM_TYPES.get(field.get_internal_type())
+            if kind is None:
+                skipped.append(rule.name)
+                continue
+            source = rule.source if rule.source in source_columns else None
+            columns.append((source, opts.get_field(rule.name).column, kind))
+        return columns, skipped
+
+    def get_checksum_error(self, source_pk) -> Optional[str]:
+        """
+        Returns reason why checksums cannot be compared, or `None`.
+        """
+        opts = self.mapper.destmodel._meta
+        if not self.mapper.preserve_pk:
+            return "primary keys are not preserved"
+        if source_pk is None:
+            return "primary key is derived by a method"
+        if CHECKSUM_TYPES.get(opts.pk.get_internal_type()) != "integer":
+            return "primary key is not an integer"
+        for using in ("source", "default"):
+            vendor = connections[using].vendor
+            if vendor not in VENDOR_SQL:
+                return f"checksums are not supported on {vendor}"
+        return None
+
+    def get_tables(self, source_pk, columns) -> tuple:
+        """
+        Returns checksums of the source and destination tables.
+        """
+        importer = self.importer_class()
+        where, params = DatabaseExportService(
+            importer.get_table_name(), filters=importer.get_export_filters()
+        ).get_where()
+        opts = self.mapper.destmodel._meta
+        source = TableChecksum(
+            "source",
+            self.mapper.get_table_name(),
+            source_pk or self.mapper.source_pk,
+            [(column, kind) for column, _, kind in columns],
+            where,
+            params,
+        )
+        dest = TableChecksum(
+            "default",
+            connections["default"].ops.quote_name(opts.db_table),
+            opts.pk.column,
+            [(column, kind) for _, column, kind in columns],
+        )
+        return source, dest
+
+    def get_rejected_keys(self, source_pk) -> tuple:
+        """
+        Returns number of rows which the mapper rejected and their source
+        keys (if `source_pk` is given) from the reject reports of the last
+        import. Reports of other runs are removed when an import starts,
+        so the report of the whole table and the reports of partitions are
+        not present at the same time.
+        """
+        partitions = [None] + (get_partitions(self.importer_class) or [])
+        total = 0
+        keys = []
+        for partition in partitions:
+            path = RejectReport(self.mapper.sourcetable, partition).get_file_path()
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path)
+            # Mappers of a fan-out write to the same report.
+            if "reject_mapper" in df.columns:
+                df = df[df["reject_mapper"] == self.mapper_class.get_mapper_name()]
+            total += len(df)
+            if source_pk is not None and source_pk in df.columns:
+                column = pd.to_numeric(df[source_pk], errors="coerce").dropna()
+                keys.extend(column.astype("int64").tolist())
+        return total, keys
+
+    def get_source_chunks(self, source, low, rejected) -> dict:
+        """
+        Returns checksums of the source chunks without the rejected rows.
+        """
+        chunks = source.get_chunks(low, self.chunk_size)
+        for start in range(0, len(rejected), self.batch_size):
+            batch = rejected[start : start + self.batch_size]
+            for chunk, values in source.get_chunks(low, self.chunk_size, batch).items():
+                chunks[chunk] = tuple(
+                    total - value for total, value in zip(chunks[chunk], values)
+                )
+        return chunks
+
+    def compare_chunks(self, source, dest, low, rejected, result) -> None:
+        """
+        Compares checksums of the chunks, rows of the chunks which differ
+        are compared one by one.
+        """
+        source_chunks = self.get_source_chunks(source, low, rejected)
+        dest_chunks = dest.get_chunks(low, self.chunk_size)
+        chunks = set(source_chunks) | set(dest_chunks)
+        mismatched = sorted(
+            chunk
+            for chunk in chunks
+            if source_chunks.get(chunk, EMPTY_CHUNK)
+            != dest_chunks.get(chunk, EMPTY_CHUNK)
+        )
+        result["chunks"] = len(chunks)
+        result["mismatched_chunks"] = len(mismatched)
+
+        rejected = set(rejected)
+        for chunk in mismatched:
+            start = low + chunk * self.chunk_size
+            end = start + self.chunk_size
+            logger.info(
+                "%s: checking rows %s-%s of %s",
+                self.mapper.sourcetable,
+                start,
+                end - 1,
+                self.mapper.destmodel._meta.db_table,
+            )
+            source_rows = source.get_rows(start, end)
+            dest_rows = dest.get_rows(start, end)
+            for key, digest in source_rows.items():
+                if key in rejected:
+                    continue
+                if key not in dest_rows:
+                    self.add_key(result, "missing", key)
+                elif dest_rows[key] != digest:
+                    self.add_key(result, "changed", key)
+            for key in dest_rows:
+                if key not in source_rows or key in rejected:
+                    self.add_key(result, "unexpected", key)
+
+    def add_key(self, result: dict, kind: str, key) -> None:
+        result[kind]["count"] += 1
+        if len(result[kind]["keys"]) < self.max_keys:
+            result[kind]["keys"].append(key)
+
+    def run(self) -> dict:
+        """
+        Verifies the destination table, returns the result as a dict.
+        """
+        start = time.perf_counter()
+        opts = self.mapper.destmodel._meta
+        source_pk = self.get_source_pk()
+        columns, skipped = self.get_columns()
+        source, dest = self.get_tables(source_pk, columns)
+        source_rows, source_min, _ = source.get_stats()
+        dest_rows, dest_min, _ = dest.get_stats()
+        rejected_rows, rejected = self.get_rejected_keys(source_pk)
+
+        result = {
+            "mapper": self.mapper_class.get_mapper_name(),
+            "sourcetable": self.mapper.sourcetable,
+            "desttable": opts.db_table,
+            "source_rows": source_rows,
+            "rejected_rows": rejected_rows,
+            "dest_rows": dest_rows,
+            "columns": [column for _, column, _ in columns],
+            "skipped_fields": skipped,
+            "checksums": None,
+            "chunks": 0,
+            "mismatched_chunks": 0,
+            "missing": {"count": 0, "keys": []},
+            "unexpected": {"count": 0, "keys": []},
+            "changed": {"count": 0, "keys": []},
+        }
+
+        error = self.get_checksum_error(source_pk)
+        if error is not None:
+            result["checksums"] = f"skipped: {error}"
+        else:
+            result["checksums"] = "compared"
+            lows = [value for value in (source_min, dest_min) if value is not None]
+            if lows:
+                self.compare_chunks(source, dest, min(lows), rejected, result)
+
+        result["ok"] = (
+            dest_rows == source_rows - rejected_rows
+            and result["mismatched_chunks"] == 0
+        )
+        result["seconds"] = round(time.perf_counter() - start, 6)
+        return result
+
+
+def verify_mapper(mapper_class, chunk_size=None) -> dict:
+    """
+    Verifies destination table of a single mapper inside a worker thread,
+    connections of the thread are closed once it is done.
+    """
+    try:
+        return Verifier(mapper_class, chunk_size).run()
+    finally:
+        connections.close_all()
@@ -28,8 +28,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-
-    "demoapp"
+    "demoapp",
 ]
 
 MIDDLEWARE = [
@@ -123,4 +122,27 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
-DB_MIGRATOR = {"SOURCE_DATABASE": {"host": ""}}
+DB_MIGRATOR = {
+    "SOURCE_DATABASE": {"host": ""},
+    "EXPORT_CHUNK_SIZE": 2000,
+    "IMPORT_CHUNK_SIZE": 10000,
+    "LOADER": "bulk_create",
+    "SOURCE_MODE": "snapshot",
+    "KEEP_SNAPSHOT": False,
+    "SNAPSHOT_FORMAT": "csv",
+    "CSV_DTYPES": True,
+    "CSV_ENGINE": "c",
+    "SNAPSHOT_CACHE": False,
+    "SNAPSHOT_CACHE_SIZE": 10240,
+    "KEY_INDEX": "memory",
+    "KEY_MAP_CACHE_SIZE": 64,
+    "WORKERS": 4,
+    "EXECUTOR": "thread",
+    "CHECKPOINTS": False,
+    "PIPELINE": False,
+    "PIPELINE_DEPTH": 2,
+    "FAST_LOAD": False,
+    "RESET_SEQUENCES": True,
+    "VERIFY_CHUNK_SIZE": 10000,
+    "RUN_REPORT": True,
+}